@@ -3,7 +3,13 @@ import pandas as pd
 import io
 from datetime import datetime
 import numpy as np
-from pathlib import Path
+
+from utils.catalog import get_catalog, get_service_packages, price_to_float
+from utils.money import to_cents, format_cents
+from utils.cart import Cart, CartItem, cart_key
+from utils.quote_store import restore_quote_session, save_quote_session
+from utils.tire_index import FilterPlan
+from utils.size_query import parse_size_query, format_size_query
 
 # Page Config
 st.set_page_config(
@@ -143,73 +149,86 @@ st.markdown(MAIN_CSS, unsafe_allow_html=True)
 # ================================================================================================
 # HELPER FUNCTIONS - DIREKT EINGEBETTET
 # ================================================================================================
-def get_efficiency_emoji(rating):
-    """Gibt Text für Effizienz-Rating zurück"""
-    if pd.isna(rating):
-        return ""
-    rating = str(rating).strip().upper()[:1]
-    return {
-        "A": "[A]", "B": "[B]", "C": "[C]", 
-        "D": "[D]", "E": "[E]", "F": "[F]", "G": "[G]"
-    }.get(rating, "")
-
-def get_stock_display(stock_value):
-    """Formatiert Bestandsanzeige mit Text"""
-    if pd.isna(stock_value) or stock_value == '':
-        return "unbekannt"
-    try:
-        stock_num = float(stock_value)
-        if stock_num < 0:
-            return f"NACHBESTELLEN ({int(stock_num)})"
-        elif stock_num == 0:
-            return f"AUSVERKAUFT ({int(stock_num)})"
-        else:
-            return f"VERFÜGBAR ({int(stock_num)})"
-    except:
-        return "unbekannt"
-
-def get_saison_from_teilenummer(teilenummer):
-    """Ermittelt Saison basierend auf Teilenummer"""
-    if pd.isna(teilenummer) or teilenummer == '':
-        return "Unbekannt"
-    teilenummer_str = str(teilenummer).strip().upper()
-    if teilenummer_str.startswith('ZTW'):
-        return "Winter"
-    elif teilenummer_str.startswith('ZTR'):
-        return "Ganzjahres"
-    elif teilenummer_str.startswith('ZTS'):
-        return "Sommer"
-    else:
-        return "Unbekannt"
+EFFICIENCY_LABELS = {
+    "A": "[A]", "B": "[B]", "C": "[C]",
+    "D": "[D]", "E": "[E]", "F": "[F]", "G": "[G]"
+}
+SAISON_BADGES = {
+    "Winter": '<span class="saison-badge saison-winter">Winter</span>',
+    "Sommer": '<span class="saison-badge saison-sommer">Sommer</span>',
+    "Ganzjahres": '<span class="saison-badge saison-ganzjahres">Ganzjahres</span>',
+}
+SAISON_BADGE_UNBEKANNT = '<span class="saison-badge">Unbekannt</span>'
+CART_INDICATOR_HTML = '<span class="cart-indicator">🛒 Im Warenkorb</span>'
 
 def get_saison_badge_html(saison):
     """Erstellt HTML Badge für Saison-Anzeige"""
-    if saison == "Winter":
-        return '<span class="saison-badge saison-winter">Winter</span>'
-    elif saison == "Sommer":
-        return '<span class="saison-badge saison-sommer">Sommer</span>'
-    elif saison == "Ganzjahres":
-        return '<span class="saison-badge saison-ganzjahres">Ganzjahres</span>'
+    return SAISON_BADGES.get(saison, SAISON_BADGE_UNBEKANNT)
+
+def get_cart_key(tire_data):
+    """Warenkorb-Schlüssel aus Teilenummer und Preis in Cent - wie TireCatalog.cart_keys"""
+    return cart_key(tire_data['Teilenummer'], to_cents(price_to_float(tire_data['Preis_EUR'])))
+
+def _text(display, col):
+    """Spalte als Text-Array - Grundlage der spaltenweisen Formatierung"""
+    return display[col].astype(str).to_numpy(dtype=object)
+
+def _filled(display, col):
+    """Werte, die weder fehlen noch leer sind"""
+    return display[col].notna().to_numpy() & (_text(display, col) != '')
+
+def _efficiency_labels(display, col):
+    """EU-Label-Klasse je Zeile wie '[B]' - leer bei unbekannten Werten"""
+    first = np.array([value.strip().upper()[:1] for value in _text(display, col)], dtype=object)
+    return np.array([EFFICIENCY_LABELS.get(value, "") for value in first], dtype=object)
+
+def build_tire_rows_markdown(display, in_cart, preis_cent):
+    """Markdown aller Zeilen der sichtbaren Seite - Anzeige-Spalten spaltenweise statt Zeile für Zeile.
+
+    preis_cent sind die Katalogpreise der Zeilen in Cent - formatiert wie Karte und Warenkorb (format_cents).
+    """
+    if 'Saison' in display.columns:
+        badge = np.array([SAISON_BADGES.get(value, SAISON_BADGE_UNBEKANNT) for value in display['Saison']], dtype=object)
     else:
-        return '<span class="saison-badge">Unbekannt</span>'
-
-def is_tire_in_cart(tire_data):
-    """Prüft ob ein Reifen bereits im Warenkorb ist"""
-    tire_id = f"{tire_data['Teilenummer']}_{tire_data['Preis_EUR']}"
-    return any(item['id'] == tire_id for item in st.session_state.cart_items)
-
-def get_dynamic_tire_sizes(filtered_df, max_sizes=12):
-    """Erstellt dynamische Liste von Reifengrößen aus gefilterten Daten, sortiert nach Größe"""
-    if filtered_df.empty:
-        return []
-    unique_sizes = filtered_df[['Breite', 'Hoehe', 'Zoll']].drop_duplicates()
-    unique_sizes = unique_sizes.sort_values(['Zoll', 'Breite', 'Hoehe'])
-    unique_sizes['size_str'] = (unique_sizes['Breite'].astype(str) + '/' + 
-                               unique_sizes['Hoehe'].astype(str) + ' R' + 
-                               unique_sizes['Zoll'].astype(str))
-    num_sizes = min(max_sizes, len(unique_sizes))
-    top_sizes = unique_sizes.head(num_sizes)['size_str'].tolist()
-    return top_sizes
+        badge = np.full(len(display), SAISON_BADGE_UNBEKANNT, dtype=object)
+    titel = (
+        "**" + display['Reifengröße'].to_numpy(dtype=object) + "** - " + _text(display, 'Fabrikat') + " "
+        + _text(display, 'Profil') + " " + badge + " " + np.where(in_cart, CART_INDICATOR_HTML, "").astype(object)
+    )
+
+    preis = "Preis: **" + np.array([format_cents(cent) for cent in preis_cent], dtype=object) + " EUR**"
+    bestand = pd.to_numeric(display['Bestand'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    hat_bestand = ~np.isnan(bestand)
+    bestand_text = (
+        " | Bestand: "
+        + np.select([bestand < 0, bestand == 0], ["NACHBESTELLEN (", "AUSVERKAUFT ("], "VERFÜGBAR (").astype(object)
+        + np.where(hat_bestand, bestand, 0).astype(int).astype(str).astype(object) + ")"
+    )
+    tragkraft = _text(display, 'Loadindex') + _text(display, 'Speedindex')
+    hat_tragkraft = (display['Loadindex'].notna() & display['Speedindex'].notna()).to_numpy() & (tragkraft != "")
+    info = preis + np.where(hat_bestand, bestand_text, "") + np.where(hat_tragkraft, " | Tragkraft: " + tragkraft, "")
+
+    laerm = pd.to_numeric(display['Geräuschklasse'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    eu_spalten = [
+        np.where(_filled(display, 'Kraftstoffeffizienz'), "Kraftstoff " + _efficiency_labels(display, 'Kraftstoffeffizienz'), ""),
+        np.where(_filled(display, 'Nasshaftung'), "Nasshaftung " + _efficiency_labels(display, 'Nasshaftung'), ""),
+        np.where(~np.isnan(laerm), "Lärm " + np.nan_to_num(laerm).astype(int).astype(str).astype(object) + "dB", ""),
+    ]
+    eu_label = [" | ".join(label for label in labels if label) for labels in zip(*eu_spalten)]
+
+    teilenummer = "<small>Teilenummer: " + _text(display, 'Teilenummer') + "</small>"
+    return [
+        "\n\n".join(zeile for zeile in (t, i, f"EU-Label: {eu}" if eu else "", tn) if zeile)
+        for t, i, eu, tn in zip(titel, info, eu_label, teilenummer)
+    ]
+
+def get_dynamic_tire_sizes(plan, max_sizes=12):
+    """Erstellt dynamische Liste von Reifengrößen aus dem Filterplan, sortiert nach Größe"""
+    return [f"{breite}/{hoehe} R{zoll}" for breite, hoehe, zoll in plan.sizes(max_sizes)]
+
+def set_size_query(text):
+    """Callback der Größen-Buttons - schreibt die Größe ins Suchfeld, bevor es gerendert wird"""
+    st.session_state.size_query = text
 
 def create_metric_card(title, value, delta=None, help_text=None):
     """Erstellt eine ansprechende Metrik-Karte"""
@@ -236,188 +255,59 @@ def create_metric_card(title, value, delta=None, help_text=None):
     </div>
     """
 
-def clean_dataframe(df):
-    """Bereinigt und normalisiert DataFrame"""
-    if df.empty:
-        return df
-    if "Preis_EUR" in df.columns:
-        if df["Preis_EUR"].dtype == object:
-            df["Preis_EUR"] = (
-                df["Preis_EUR"]
-                .astype(str)
-                .str.replace(",", ".", regex=False)
-                .str.replace("€", "", regex=False)
-                .str.strip()
-            )
-        df["Preis_EUR"] = pd.to_numeric(df["Preis_EUR"], errors="coerce")
-    for c in ["Breite", "Hoehe", "Zoll"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce").astype("Int64")
-    if "Bestand" in df.columns:
-        df["Bestand"] = pd.to_numeric(df["Bestand"], errors="coerce")
-    required_cols = ["Fabrikat", "Profil", "Kraftstoffeffizienz", "Nasshaftung", 
-                     "Loadindex", "Speedindex", "Teilenummer", "Geräuschklasse"]
-    for col in required_cols:
-        if col not in df.columns:
-            df[col] = pd.NA
-    if "Saison" not in df.columns:
-        df["Saison"] = df["Teilenummer"].apply(get_saison_from_teilenummer)
-    df = df.dropna(subset=["Preis_EUR", "Breite", "Hoehe", "Zoll"], how="any")
-    if not df.empty:
-        df["Breite"] = df["Breite"].astype(int)
-        df["Hoehe"] = df["Hoehe"].astype(int)
-        df["Zoll"] = df["Zoll"].astype(int)
-    return df
+def get_facet_value(key):
+    """Aktuelle Auswahl einer Facetten-Selectbox - None bei 'Alle'"""
+    value = st.session_state.get(key, "Alle")
+    return None if value == "Alle" else value
+
+def render_facet_selectbox(label, key, facet, plan, filter_stages):
+    """Selectbox mit Trefferzahlen wie 'Continental (23)' - Werte ohne Treffer entfallen"""
+    counts = plan.facet_counts(filter_stages, facet)
+    current = st.session_state.get(key, "Alle")
+    if current != "Alle" and current not in counts:
+        st.session_state[key] = current = "Alle"
+    options = ["Alle"] + [value for value, count in counts.items() if count > 0 or value == current]
+    return st.selectbox(
+        label,
+        options=options,
+        key=key,
+        format_func=lambda value: value if value == "Alle" else f"{value} ({counts.get(value, 0)})",
+    )
 
 # ================================================================================================
 # NEUE SERVICE-PAKET FUNKTIONEN
 # ================================================================================================
-@st.cache_data
-def load_service_packages():
-    """Lädt die Service-Pakete aus der CSV"""
-    try:
-        csv_path = Path("data/ramsperger_services_config.csv")
-        if csv_path.exists():
-            df = pd.read_csv(csv_path, encoding='utf-8')
-            return df
-        else:
-            # Fallback falls CSV nicht existiert
-            return pd.DataFrame(columns=['Positionsnummer', 'Bezeichnung', 'Teilenummer_Detail', 'Preis', 'Hinweis', 'Zoll'])
-    except Exception as e:
-        st.error(f"Fehler beim Laden der Service-Pakete: {e}")
-        return pd.DataFrame(columns=['Positionsnummer', 'Bezeichnung', 'Teilenummer_Detail', 'Preis', 'Hinweis', 'Zoll'])
-
-def filter_service_packages_by_tire_size(tire_zoll):
-    """Filtert Service-Pakete basierend auf der Reifengröße"""
-    service_df = load_service_packages()
-    if service_df.empty:
-        return service_df
-    
-    available_packages = []
-    
-    for _, package in service_df.iterrows():
-        package_zoll = package.get('Zoll', None)
-        
-        # Wenn kein Zoll angegeben (None oder NaN), dann für alle Größen verfügbar
-        if pd.isna(package_zoll) or package_zoll is None or package_zoll == '':
-            available_packages.append(package)
-            continue
-            
-        # Zoll-Beschränkungen prüfen
-        package_zoll_str = str(package_zoll).strip()
-        
-        if package_zoll_str == '-17':
-            # Bis 17 Zoll
-            if tire_zoll <= 17:
-                available_packages.append(package)
-        elif package_zoll_str == '18-19':
-            # 18-19 Zoll
-            if 18 <= tire_zoll <= 19:
-                available_packages.append(package)
-        elif package_zoll_str == '20-':
-            # Ab 20 Zoll
-            if tire_zoll >= 20:
-                available_packages.append(package)
-        else:
-            # Unbekannte Zoll-Angabe - vorsichtshalber anzeigen
-            available_packages.append(package)
-    
-    if available_packages:
-        return pd.DataFrame(available_packages)
-    else:
-        return pd.DataFrame(columns=['Positionsnummer', 'Bezeichnung', 'Teilenummer_Detail', 'Preis', 'Hinweis', 'Zoll'])
+def filter_service_packages_for_tire(tire_data):
+    """Service-Pakete, deren Regeln (Zoll, ggf. Saison) auf den Reifen passen"""
+    return get_service_packages().for_tire(tire_data)
 
 # ================================================================================================
-# DATA MANAGEMENT - VEREINFACHT FÜR EINE CSV
+# DATA MANAGEMENT - GETEILTER KATALOG FÜR ALLE SESSIONS
 # ================================================================================================
-def load_reifen_data():
-    """Lädt die Reifen-CSV-Datei"""
-    data_dir = Path("data")
-    csv_path = data_dir / "Ramsperger_Winterreifen_20250826_160010.csv"
-    try:
-        if csv_path.exists():
-            df = pd.read_csv(csv_path, encoding='utf-8')
-            df_clean = clean_dataframe(df)
-            return df_clean
-        else:
-            return create_fallback_data()
-    except Exception:
-        return create_fallback_data()
-
-def create_fallback_data():
-    """Fallback Beispiel-Daten falls CSV nicht geladen werden kann"""
-    sample_data = {
-        'Breite': [195, 205, 215, 225, 195, 205, 215, 225],
-        'Hoehe': [65, 55, 60, 55, 60, 60, 55, 50],
-        'Zoll': [15, 16, 16, 17, 16, 17, 17, 18],
-        'Fabrikat': ['Continental', 'Michelin', 'Bridgestone', 'Pirelli', 'Continental', 'Michelin', 'Bridgestone', 'Pirelli'],
-        'Profil': ['WinterContact TS850', 'Alpin 6', 'Blizzak LM005', 'Winter Sottozero 3', 'WinterContact TS860', 'Alpin 5', 'Blizzak WS90', 'Winter Sottozero Serie II'],
-        'Teilenummer': ['ZTW15494940000', 'ZTW03528700000', 'ZTW19394', 'ZTW8019227308853', 'ZTS15495040000', 'ZTS03528800000', 'ZTR19395', 'ZTR8019227308854'],
-        'Preis_EUR': [89.90, 95.50, 87.20, 99.90, 92.90, 98.50, 89.20, 103.90],
-        'Loadindex': [91, 91, 94, 94, 88, 91, 94, 97],
-        'Speedindex': ['T', 'H', 'H', 'V', 'H', 'H', 'H', 'V'],
-        'Kraftstoffeffizienz': ['C', 'B', 'A', 'C', 'C', 'B', 'A', 'C'],
-        'Nasshaftung': ['B', 'A', 'A', 'B', 'B', 'A', 'A', 'B'],
-        'Bestand': [25, 12, 8, 15, 30, 0, -5, 20],
-        'Geräuschklasse': [68, 69, 67, 70, 68, 69, 67, 71]
-    }
-    df = pd.DataFrame(sample_data)
-    df["Saison"] = df["Teilenummer"].apply(get_saison_from_teilenummer)
-    return df
-
 def get_reifen_data():
-    """Hauptfunktion - lädt Reifen-Daten"""
-    if 'reifen_data' not in st.session_state or 'data_loaded' not in st.session_state:
-        st.session_state.reifen_data = load_reifen_data()
-        st.session_state.data_loaded = True
-    return st.session_state.reifen_data
+    """Hauptfunktion - liefert den prozessweit geteilten Reifen-Katalog (nur lesen!)"""
+    return get_catalog()
 
 # ================================================================================================
 # CART MANAGEMENT - DIREKT EINGEBETTET - ANGEPASST FÜR NEUE SERVICE-PAKETE
 # ================================================================================================
 def add_to_cart_with_config(tire_data, quantity, selected_packages):
     """Fügt einen Reifen mit Service-Paketen zum Warenkorb hinzu"""
-    tire_id = f"{tire_data['Teilenummer']}_{tire_data['Preis_EUR']}"
-    for item in st.session_state.cart_items:
-        if item['id'] == tire_id:
-            return False, "Reifen bereits im Warenkorb"
-    cart_item = {
-        'id': tire_id,
-        'Reifengröße': f"{tire_data['Breite']}/{tire_data['Hoehe']} R{tire_data['Zoll']}",
-        'Fabrikat': tire_data['Fabrikat'],
-        'Profil': tire_data['Profil'],
-        'Teilenummer': tire_data['Teilenummer'],
-        'Preis_EUR': tire_data['Preis_EUR'],
-        'Zoll': tire_data['Zoll'],
-        'Bestand': tire_data.get('Bestand', '-'),
-        'Kraftstoffeffizienz': tire_data.get('Kraftstoffeffizienz', ''),
-        'Nasshaftung': tire_data.get('Nasshaftung', ''),
-        'Saison': tire_data.get('Saison', 'Unbekannt')
-    }
-    st.session_state.cart_items.append(cart_item)
-    st.session_state.cart_quantities[tire_id] = quantity
-    st.session_state.cart_services[tire_id] = selected_packages
-    st.session_state.cart_count = len(st.session_state.cart_items)
-    return True, f"{quantity}x {cart_item['Reifengröße']} hinzugefügt"
+    preis_cent = to_cents(price_to_float(tire_data['Preis_EUR']))
+    cart_item = CartItem.from_row(
+        tire_data, cart_key(tire_data['Teilenummer'], preis_cent), preis_cent,
+        menge=quantity, services=selected_packages
+    )
+    if not st.session_state.cart.add(cart_item):
+        return False, "Reifen bereits im Warenkorb"
+    save_quote_session()
+    return True, f"{quantity}x {cart_item.reifengroesse} hinzugefügt"
 
 def remove_from_cart(tire_data):
     """Entfernt einen Reifen aus dem Warenkorb"""
-    tire_id = f"{tire_data['Teilenummer']}_{tire_data['Preis_EUR']}"
-    
-    # Entferne aus cart_items
-    st.session_state.cart_items = [item for item in st.session_state.cart_items if item['id'] != tire_id]
-    
-    # Entferne aus cart_quantities
-    if tire_id in st.session_state.cart_quantities:
-        del st.session_state.cart_quantities[tire_id]
-    
-    # Entferne aus cart_services
-    if tire_id in st.session_state.cart_services:
-        del st.session_state.cart_services[tire_id]
-    
-    # Aktualisiere cart_count
-    st.session_state.cart_count = len(st.session_state.cart_items)
-    
+    # Menge und Service-Pakete hängen an der Position und gehen mit ihr
+    st.session_state.cart.remove(get_cart_key(tire_data))
+    save_quote_session()
     return True, f"Reifen {tire_data['Fabrikat']} {tire_data['Profil']} aus Warenkorb entfernt"
 
 # ================================================================================================
@@ -431,25 +321,28 @@ def init_session_state():
         st.session_state.top_zoll_filter = "Alle"
     if 'top_bestand_filter' not in st.session_state:
         st.session_state.top_bestand_filter = True
-    if 'selected_size' not in st.session_state:
-        st.session_state.selected_size = None
+    if 'size_query' not in st.session_state:
+        st.session_state.size_query = ""
     if 'opened_tire_cards' not in st.session_state:
         st.session_state.opened_tire_cards = set()
-    if 'cart_items' not in st.session_state:
-        st.session_state.cart_items = []
-    if 'cart_quantities' not in st.session_state:
-        st.session_state.cart_quantities = {}
-    if 'cart_services' not in st.session_state:
-        st.session_state.cart_services = {}
-    if 'cart_count' not in st.session_state:
-        st.session_state.cart_count = 0
+    # Warenkorb: Positionen mit Menge und Service-Paketen, Zugriff per Schlüssel
+    if 'cart' not in st.session_state:
+        st.session_state.cart = Cart()
     # Neue Session State für Service-Pakete
     if 'show_service_packages' not in st.session_state:
         st.session_state.show_service_packages = {}
+    # Seitenweise Ergebnisliste
+    if 'tire_list_page' not in st.session_state:
+        st.session_state.tire_list_page = 0
+    if 'tire_list_result_key' not in st.session_state:
+        st.session_state.tire_list_result_key = None
 
 # ================================================================================================
 # RENDER FUNCTIONS - MIT NEUER SERVICE-PAKET AUSWAHL
 # ================================================================================================
+# Reifen pro Seite der Ergebnisliste - jede Zeile erzeugt mehrere Elemente und Buttons
+TIRE_LIST_PAGE_SIZE = 50
+
 def render_config_card(row, idx, filtered_df):
     """Rendert die Konfigurationskarte für einen Reifen - MIT NEUER SERVICE-PAKET LOGIK"""
     st.markdown(f"""<div class="config-card">""", unsafe_allow_html=True)
@@ -468,8 +361,8 @@ def render_config_card(row, idx, filtered_df):
             key=f"qty_{idx}",
             help="Anzahl der Reifen (1-8 Stück)"
         )
-        total_price = row['Preis_EUR'] * quantity
-        st.metric("Reifen-Gesamtpreis", f"{total_price:.2f} EUR")
+        total_cent = to_cents(price_to_float(row['Preis_EUR'])) * quantity
+        st.metric("Reifen-Gesamtpreis", f"{format_cents(total_cent)} EUR")
         
         # NEUER SERVICE-LEISTUNGEN BUTTON
         show_packages_key = f"show_packages_{idx}"
@@ -483,25 +376,21 @@ def render_config_card(row, idx, filtered_df):
     with col_config2:
         # SERVICE-PAKETE ANZEIGE (nur wenn Button geklickt)
         selected_packages = []
-        service_total = 0.0
+        service_total_cent = 0
         
         if st.session_state.show_service_packages.get(show_packages_key, False):
             st.markdown("**Verfügbare Service-Pakete:**")
             
-            # Service-Pakete für diese Reifengröße laden
-            tire_zoll = row['Zoll']
-            available_packages = filter_service_packages_by_tire_size(tire_zoll)
+            # Service-Pakete für diesen Reifen laden
+            available_packages = filter_service_packages_for_tire(row)
             
-            if not available_packages.empty:
+            if available_packages:
                 with st.container():
                     st.markdown(f'<div class="service-packages-box">', unsafe_allow_html=True)
                     
-                    for pkg_idx, package in available_packages.iterrows():
+                    for package in available_packages:
                         package_key = f"pkg_{idx}_{package['Positionsnummer']}"
                         
-                        # Preis formatieren
-                        pkg_price = float(package['Preis'])
-                        
                         # Beschreibung mit Hinweis
                         description = package['Bezeichnung']
                         if pd.notna(package['Hinweis']) and package['Hinweis'].strip() != '':
@@ -509,7 +398,7 @@ def render_config_card(row, idx, filtered_df):
                         
                         # Checkbox für Paket
                         is_selected = st.checkbox(
-                            f"{description} - {pkg_price:.2f}€",
+                            f"{description} - {format_cents(package['Preis_Cent'])}€",
                             key=package_key
                         )
                         
@@ -517,24 +406,23 @@ def render_config_card(row, idx, filtered_df):
                             selected_packages.append({
                                 'positionsnummer': package['Positionsnummer'],
                                 'bezeichnung': package['Bezeichnung'],
-                                'preis': pkg_price,
+                                'preis_cent': package['Preis_Cent'],
                                 'hinweis': package['Hinweis'] if pd.notna(package['Hinweis']) else ''
                             })
                             
                             # Alle Service-Pakete sind Pauschalpreise
-                            service_total += pkg_price
+                            service_total_cent += package['Preis_Cent']
                     
                     st.markdown('</div>', unsafe_allow_html=True)
             else:
                 st.info("Keine Service-Pakete für diese Reifengröße verfügbar.")
         
         # Service-Kosten anzeigen
-        if service_total > 0:
-            st.metric("Service-Kosten", f"{service_total:.2f} EUR")
+        if service_total_cent > 0:
+            st.metric("Service-Kosten", f"{format_cents(service_total_cent)} EUR")
 
     # Gesamtsumme
-    grand_total = total_price + service_total
-    st.markdown(f"### **Gesamtsumme: {grand_total:.2f} EUR**")
+    st.markdown(f"### **Gesamtsumme: {format_cents(total_cent + service_total_cent)} EUR**")
 
     col_add, col_cancel = st.columns(2)
     with col_add:
@@ -563,17 +451,55 @@ def render_config_card(row, idx, filtered_df):
 
     st.markdown("</div>", unsafe_allow_html=True)
 
-def render_tire_list(filtered_df):
-    """Rendert die Reifen-Liste mit verbesserter Darstellung und Warenkorb-Anzeige"""
-    display = filtered_df.copy().reset_index(drop=True)
+def set_tire_list_page(page):
+    """Callback der Seitennavigation"""
+    st.session_state.tire_list_page = page
+
+def render_page_navigation(page, n_pages, start, end, total, position):
+    """Blättern in der Ergebnisliste - Zurück/Weiter und Anzeige des Ausschnitts"""
+    col_prev, col_info, col_next = st.columns([1, 3, 1])
+    with col_prev:
+        st.button("< Zurück", key=f"tire_page_prev_{position}", use_container_width=True,
+                  disabled=page == 0, on_click=set_tire_list_page, args=(page - 1,))
+    with col_info:
+        st.markdown(f"<div style='text-align: center;'>Seite {page + 1} von {n_pages} · Reifen {start + 1}-{end} von {total}</div>",
+                    unsafe_allow_html=True)
+    with col_next:
+        st.button("Weiter >", key=f"tire_page_next_{position}", use_container_width=True,
+                  disabled=page >= n_pages - 1, on_click=set_tire_list_page, args=(page + 1,))
+
+def render_tire_list(filtered_df, result_key=None):
+    """Rendert eine Seite der Reifen-Liste mit Warenkorb-Anzeige - die Seite bleibt über Reruns erhalten"""
+    # Neue Filter oder Sortierung - zurück auf die erste Seite
+    if result_key != st.session_state.tire_list_result_key:
+        st.session_state.tire_list_result_key = result_key
+        st.session_state.tire_list_page = 0
+
+    n_pages = max(1, -(-len(filtered_df) // TIRE_LIST_PAGE_SIZE))
+    page = min(max(st.session_state.tire_list_page, 0), n_pages - 1)
+    st.session_state.tire_list_page = page
+    start = page * TIRE_LIST_PAGE_SIZE
+    end = min(start + TIRE_LIST_PAGE_SIZE, len(filtered_df))
+
+    # Nur die sichtbare Seite aufbereiten - der Index bleibt die Position in der Gesamtliste,
+    # damit Karten- und Button-Keys beim Blättern stabil bleiben
+    display = filtered_df.iloc[start:end].reset_index(drop=True)
+    display.index += start
     display["Reifengröße"] = (
         display["Breite"].astype(str) + "/" + display["Hoehe"].astype(str) + " R" + display["Zoll"].astype(str)
     )
 
     st.markdown("**Reifen auswählen und konfigurieren:**")
+    if n_pages > 1:
+        render_page_navigation(page, n_pages, start, end, len(filtered_df), "top")
+
+    catalog = get_reifen_data()
+    visible = filtered_df.iloc[start:end]
+    in_cart = np.isin(catalog.cart_keys_for(visible), list(st.session_state.cart.keys()))
+    rows_markdown = build_tire_rows_markdown(display, in_cart, catalog.preis_cent_for(visible))
 
-    for idx, row in display.iterrows():
-        is_in_cart = is_tire_in_cart(row)
+    for idx, is_in_cart, row_markdown in zip(display.index, in_cart, rows_markdown):
+        row = display.loc[idx]
         
         # Layout: Info + Button + Remove Button (wenn im Warenkorb)
         if is_in_cart:
@@ -582,34 +508,8 @@ def render_tire_list(filtered_df):
             col_info, col_button = st.columns([5, 1])
 
         with col_info:
-            saison_badge = get_saison_badge_html(row.get('Saison', 'Unbekannt'))
-            cart_indicator = ""
-            if is_in_cart:
-                cart_indicator = '<span class="cart-indicator">🛒 Im Warenkorb</span>'
-            st.markdown(f"**{row['Reifengröße']}** - {row['Fabrikat']} {row['Profil']} {saison_badge} {cart_indicator}", unsafe_allow_html=True)
-
-            preis_display = f"**{float(row['Preis_EUR']):.2f} EUR**"
-            bestand_display = get_stock_display(row['Bestand'])
-            tragkraft_display = f"{row['Loadindex']}{row['Speedindex']}" if pd.notna(row['Loadindex']) and pd.notna(row['Speedindex']) else ""
-
-            info_zeile = f"Preis: {preis_display}"
-            if bestand_display != "unbekannt":
-                info_zeile += f" | Bestand: {bestand_display}"
-            if tragkraft_display:
-                info_zeile += f" | Tragkraft: {tragkraft_display}"
-            st.markdown(info_zeile)
-
-            eu_labels = []
-            if pd.notna(row['Kraftstoffeffizienz']) and row['Kraftstoffeffizienz'] != '':
-                eu_labels.append(f"Kraftstoff {get_efficiency_emoji(row['Kraftstoffeffizienz'])}")
-            if pd.notna(row['Nasshaftung']) and row['Nasshaftung'] != '':
-                eu_labels.append(f"Nasshaftung {get_efficiency_emoji(row['Nasshaftung'])}")
-            if pd.notna(row['Geräuschklasse']) and row['Geräuschklasse'] != '':
-                eu_labels.append(f"Lärm {int(row['Geräuschklasse'])}dB")
-            if eu_labels:
-                st.markdown(f"EU-Label: {' | '.join(eu_labels)}")
-
-            st.markdown(f"<small>Teilenummer: {row['Teilenummer']}</small>", unsafe_allow_html=True)
+            # Ein Element pro Reifen - Titel, Preiszeile, EU-Label und Teilenummer als Absätze
+            st.markdown(row_markdown, unsafe_allow_html=True)
 
         with col_button:
             card_key = f"tire_card_{idx}"
@@ -648,19 +548,24 @@ def render_tire_list(filtered_df):
 
         st.markdown("---")
 
+    if n_pages > 1:
+        render_page_navigation(page, n_pages, start, end, len(filtered_df), "bottom")
+
 def render_statistics(filtered_df):
-    """Rendert Statistiken"""
+    """Rendert Statistiken - Preise aus den Cent-Werten des Katalogs wie in der Liste"""
     st.subheader("Statistiken")
+    preis_cent = get_reifen_data().preis_cent_for(filtered_df)
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        avg_price = filtered_df['Preis_EUR'].mean()
-        st.markdown(create_metric_card("Durchschnittspreis", f"{avg_price:.2f} EUR"), unsafe_allow_html=True)
+        # Durchschnitt kaufmännisch auf ganze Cent gerundet
+        avg_price = (2 * int(preis_cent.sum()) + len(preis_cent)) // (2 * len(preis_cent))
+        st.markdown(create_metric_card("Durchschnittspreis", f"{format_cents(avg_price)} EUR"), unsafe_allow_html=True)
     with col2:
-        min_price = filtered_df['Preis_EUR'].min()
-        st.markdown(create_metric_card("Günstigster Reifen", f"{min_price:.2f} EUR"), unsafe_allow_html=True)
+        min_price = preis_cent.min()
+        st.markdown(create_metric_card("Günstigster Reifen", f"{format_cents(min_price)} EUR"), unsafe_allow_html=True)
     with col3:
-        max_price = filtered_df['Preis_EUR'].max()
-        st.markdown(create_metric_card("Teuerster Reifen", f"{max_price:.2f} EUR"), unsafe_allow_html=True)
+        max_price = preis_cent.max()
+        st.markdown(create_metric_card("Teuerster Reifen", f"{format_cents(max_price)} EUR"), unsafe_allow_html=True)
     with col4:
         unique_sizes = len(filtered_df[["Breite", "Hoehe", "Zoll"]].drop_duplicates())
         st.markdown(create_metric_card("Verfügbare Größen", str(unique_sizes)), unsafe_allow_html=True)
@@ -696,6 +601,8 @@ def render_legend(mit_bestand, saison_filter, zoll_filter):
 # MAIN FUNCTION - MIT LOGO GANZ OBEN UND LOGO_2.PNG
 # ================================================================================================
 def main():
+    # Gespeichertes Angebot aus der URL zurückholen (Neuladen, Server-Neustart)
+    restore_quote_session()
     init_session_state()
 
     # Logo Header ganz oben
@@ -711,7 +618,8 @@ def main():
     st.markdown('<div class="logo-spacer"></div>', unsafe_allow_html=True)
 
     # Daten laden
-    df = get_reifen_data()
+    catalog = get_reifen_data()
+    df = catalog.df
     if df.empty:
         st.warning("Keine Reifen-Daten verfügbar. Bitte prüfe die CSV-Datei.")
         st.stop()
@@ -720,7 +628,7 @@ def main():
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        cart_count = st.session_state.cart_count
+        cart_count = len(st.session_state.cart)
         cart_text = f"Warenkorb ({cart_count})" if cart_count > 0 else "Warenkorb"
         if st.button(cart_text, key="nav_cart", help="Zum Warenkorb wechseln", use_container_width=True, type="primary"):
             st.switch_page("pages/02_Warenkorb.py")
@@ -735,7 +643,7 @@ def main():
         )
 
     with col3:
-        zoll_opt = ["Alle"] + sorted(df["Zoll"].unique().tolist())
+        zoll_opt = ["Alle"] + catalog.facet_options["Zoll"]
         st.selectbox(
             "Zoll:",
             options=zoll_opt,
@@ -755,64 +663,86 @@ def main():
     zoll_filter   = st.session_state.top_zoll_filter
     mit_bestand   = st.session_state.top_bestand_filter
 
-    # FILTER BEREITS HIER ANWENDEN FÜR DYNAMISCHE REIFENGRÖSSEN
-    filtered_for_sizes = df.copy()
+    # GEMEINSAMER FILTERPLAN FÜR DYNAMISCHE REIFENGRÖSSEN UND ERGEBNISLISTE
+    plan = FilterPlan(
+        catalog.filter_engine,
+        zoll=None if zoll_filter == "Alle" else int(zoll_filter),
+        mit_bestand=mit_bestand,
+        saison=None if saison_filter == "Alle" else saison_filter,
+    )
 
-    if mit_bestand:
-        filtered_for_sizes = filtered_for_sizes[(filtered_for_sizes['Bestand'].notna()) & (filtered_for_sizes['Bestand'] > 0)]
-    if saison_filter != "Alle":
-        filtered_for_sizes = filtered_for_sizes[filtered_for_sizes['Saison'] == saison_filter]
-    if zoll_filter != "Alle":
-        filtered_for_sizes = filtered_for_sizes[filtered_for_sizes["Zoll"] == int(zoll_filter)]
+    # FREITEXT-GRÖSSENSUCHE - Eingabe wie auf der Reifenflanke
+    st.text_input(
+        "Reifengröße:",
+        key="size_query",
+        placeholder="z.B. 205/55 R16 91H oder 2055516",
+        help="Breite/Höhe R Zoll, optional mit Last- und Geschwindigkeitsindex - auch ohne Trennzeichen",
+    )
+    size_query = parse_size_query(st.session_state.size_query)
+    active_size = format_size_query(size_query) if size_query else None
 
     # AUFKLAPPBARE REIFENGRÖSSEN MIT DYNAMISCHER LISTE
     with st.expander("Gängige Reifengrößen", expanded=False):
-        dynamic_sizes = get_dynamic_tire_sizes(filtered_for_sizes, max_sizes=12)
+        dynamic_sizes = get_dynamic_tire_sizes(plan, max_sizes=12)
         if dynamic_sizes:
-            st.markdown(f"**Häufigste Reifengrößen aus {len(filtered_for_sizes)} verfügbaren Reifen:**")
+            st.markdown(f"**Häufigste Reifengrößen aus {len(plan)} verfügbaren Reifen:**")
             cols = st.columns(4)
             for i, size in enumerate(dynamic_sizes):
                 with cols[i % 4]:
-                    button_type = "primary" if st.session_state.selected_size == size else "secondary"
-                    if st.button(size, key=f"size_btn_{size}", use_container_width=True, type=button_type):
-                        st.session_state.selected_size = size
-                        st.rerun()
+                    button_type = "primary" if active_size == size else "secondary"
+                    st.button(size, key=f"size_btn_{size}", use_container_width=True, type=button_type,
+                              on_click=set_size_query, args=(size,))
         else:
             st.info("Keine Reifengrößen für die aktuelle Filterauswahl verfügbar.")
 
         st.markdown("---")
         col_reset1, col_reset2, col_reset3 = st.columns([1, 1, 1])
         with col_reset2:
-            if st.button("Schnellauswahl zurücksetzen", key="reset_selection", help="Reifengrößen-Auswahl aufheben", use_container_width=True):
-                if st.session_state.selected_size:
-                    st.session_state.selected_size = None
-                    st.rerun()
+            st.button("Schnellauswahl zurücksetzen", key="reset_selection", help="Reifengrößen-Auswahl aufheben",
+                      use_container_width=True, on_click=set_size_query, args=("",))
 
-    # Sidebar: Detailfilter
+    # Größensuche anzeigen - die Auflösung übernimmt die Filterstufe "groesse" über den Größen-Index
+    if size_query:
+        st.markdown(f"""
+        <div class="warning-box">
+            <h4>Reifengröße aktiv: {active_size}</h4>
+        </div>
+        """, unsafe_allow_html=True)
+    elif st.session_state.size_query.strip():
+        st.warning(f"Reifengröße '{st.session_state.size_query.strip()}' nicht erkannt - z.B. 205/55 R16 91H oder 2055516")
+
+    # Sidebar: Detailfilter mit Live-Trefferzahlen
     with st.sidebar:
         st.header("Detailfilter")
-        breite_opt = ["Alle"] + sorted(df["Breite"].unique().tolist())
-        hoehe_opt = ["Alle"] + sorted(df["Hoehe"].unique().tolist())
-        fabrikat_opt = ["Alle"] + sorted([x for x in df["Fabrikat"].dropna().unique().tolist()])
-
-        breite_filter = st.selectbox("Breite (mm)", options=breite_opt, index=0)
-        hoehe_filter = st.selectbox("Höhe (%)", options=hoehe_opt, index=0)
-        fabrikat = st.selectbox("Fabrikat", options=fabrikat_opt, index=0)
 
-        loadindex_opt = ["Alle"] + sorted([x for x in df["Loadindex"].dropna().astype(str).unique().tolist()])
-        speedindex_opt = ["Alle"] + sorted([x for x in df["Speedindex"].dropna().astype(str).unique().tolist()])
-
-        loadindex_filter = st.selectbox("Loadindex", options=loadindex_opt, index=0)
-        speedindex_filter = st.selectbox("Speedindex", options=speedindex_opt, index=0)
-
-        min_price = float(df["Preis_EUR"].min())
-        max_price = float(df["Preis_EUR"].max())
-        min_preis, max_preis = st.slider(
+        min_price, max_price = catalog.price_range
+        preis_auswahl = st.session_state.get("sidebar_preis")
+        if preis_auswahl is None or preis_auswahl[0] < min_price or preis_auswahl[1] > max_price:
+            st.session_state.sidebar_preis = (min_price, max_price)
+
+        # Aktueller Stand aller Detailfilter - Grundlage der Trefferzahlen jeder Facette
+        filter_stages = [
+            ("groesse", size_query),
+            ("breite", get_facet_value("sidebar_breite")),
+            ("hoehe", get_facet_value("sidebar_hoehe")),
+            ("fabrikat", get_facet_value("sidebar_fabrikat")),
+            ("loadindex", get_facet_value("sidebar_loadindex")),
+            ("speedindex", get_facet_value("sidebar_speedindex")),
+            ("preis", tuple(st.session_state.sidebar_preis)),
+        ]
+
+        render_facet_selectbox("Breite (mm)", "sidebar_breite", "breite", plan, filter_stages)
+        render_facet_selectbox("Höhe (%)", "sidebar_hoehe", "hoehe", plan, filter_stages)
+        render_facet_selectbox("Fabrikat", "sidebar_fabrikat", "fabrikat", plan, filter_stages)
+        render_facet_selectbox("Loadindex", "sidebar_loadindex", "loadindex", plan, filter_stages)
+        render_facet_selectbox("Speedindex", "sidebar_speedindex", "speedindex", plan, filter_stages)
+
+        st.slider(
             "Preisbereich (EUR)",
             min_value=min_price,
             max_value=max_price,
-            value=(min_price, max_price),
             step=5.0,
+            key="sidebar_preis",
         )
 
         sortierung = st.selectbox(
@@ -822,50 +752,11 @@ def main():
 
         show_stats = st.checkbox("Statistiken anzeigen", value=False)
 
-    # Komplette Filterung
-    filtered = df.copy()
-    if mit_bestand:
-        filtered = filtered[(filtered['Bestand'].notna()) & (filtered['Bestand'] > 0)]
-    if saison_filter != "Alle":
-        filtered = filtered[filtered['Saison'] == saison_filter]
-    if zoll_filter != "Alle":
-        filtered = filtered[filtered["Zoll"] == int(zoll_filter)]
-
-    if st.session_state.selected_size:
-        parts = st.session_state.selected_size.split("/")
-        b = int(parts[0])
-        h = int(parts[1].split(" R")[0])
-        z = int(parts[1].split(" R")[1])
-        filtered = filtered[(filtered["Breite"] == b) & (filtered["Hoehe"] == h) & (filtered["Zoll"] == z)]
-        st.markdown(f"""
-        <div class="warning-box">
-            <h4>Schnellauswahl aktiv: {st.session_state.selected_size}</h4>
-        </div>
-        """, unsafe_allow_html=True)
-
-    if breite_filter != "Alle":
-        filtered = filtered[filtered["Breite"] == int(breite_filter)]
-    if hoehe_filter != "Alle":
-        filtered = filtered[filtered["Hoehe"] == int(hoehe_filter)]
-    if fabrikat != "Alle":
-        filtered = filtered[filtered["Fabrikat"] == fabrikat]
-    if loadindex_filter != "Alle":
-        filtered = filtered[filtered["Loadindex"].astype(str) == str(loadindex_filter)]
-    if speedindex_filter != "Alle":
-        filtered = filtered[filtered["Speedindex"].astype(str) == str(speedindex_filter)]
-
-    filtered = filtered[(filtered["Preis_EUR"] >= min_preis) & (filtered["Preis_EUR"] <= max_preis)]
-
-    if sortierung == "Preis aufsteigend":
-        filtered = filtered.sort_values("Preis_EUR")
-    elif sortierung == "Preis absteigend":
-        filtered = filtered.sort_values("Preis_EUR", ascending=False)
-    elif sortierung == "Fabrikat":
-        filtered = filtered.sort_values(["Fabrikat", "Preis_EUR"])
-    elif sortierung == "Reifengröße":
-        filtered = filtered.sort_values(["Zoll", "Breite", "Hoehe", "Preis_EUR"])
-    elif sortierung == "Saison":
-        filtered = filtered.sort_values(["Saison", "Preis_EUR"])
+    # Komplette Filterung - setzt auf dem gemeinsamen Präfix des Filterplans auf.
+    # Jede Stufe wird unter den bisherigen Filterwerten zwischengespeichert - ändert sich
+    # nur Preis oder Sortierung, setzt die Engine auf der bereits eingeengten Menge auf
+    positions = plan.results(filter_stages + [("sortierung", sortierung)])
+    filtered = df.iloc[positions]
 
     # Gefundene Reifen anzeigen
     if len(filtered) > 0:
@@ -883,7 +774,7 @@ def main():
             header_text += f" {' '.join(filter_info)}"
 
         st.subheader(header_text)
-        render_tire_list(filtered)
+        render_tire_list(filtered, result_key=(plan.key, tuple(filter_stages), sortierung))
 
         if show_stats:
             render_statistics(filtered)
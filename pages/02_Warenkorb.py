@@ -1,3 +1,4 @@
+import sqlite3
 import streamlit as st
 import pandas as pd
 from datetime import datetime
@@ -6,13 +7,21 @@ from pathlib import Path
 # Import der ausgelagerten PDF- und Angebots-Funktionen - KORRIGIERTER IMPORT FÜR UTILS ORDNER
 from utils.pdf_generator import (
     get_filial_data, get_filial_options, get_mitarbeiter_for_filial, get_filial_info, build_phone_number,
-    load_service_packages, get_service_package_by_positionsnummer,
+    get_service_packages, get_service_package_by_positionsnummer,
     create_personalized_salutation, detect_cart_season, get_season_greeting_text, 
-    has_services_in_cart, get_dynamic_title, calculate_position_total, get_cart_total,
+    has_services_in_cart, get_dynamic_title, get_cart_totals,
     create_professional_pdf, create_email_text, create_mailto_link,
     create_td_email_text, create_td_mailto_link
 )
 
+from utils.money import format_cents
+from utils.cart import Cart, STANDARD_MENGE
+from utils.quote_store import (
+    STATUS_ABGESCHLOSSEN, STATUS_VERWORFEN,
+    list_quotes, open_quote, restore_quote_session, save_quote_session, close_quote_session,
+    keep_own_quote_version
+)
+
 # Page Config
 st.set_page_config(
     page_title="Warenkorb - Ramsperger",
@@ -100,54 +109,67 @@ def get_stock_display(stock_value):
 # ================================================================================================
 # CART OPERATIONS - ANGEPASST FÜR NEUE SERVICE-PAKETE
 # ================================================================================================
-def remove_from_cart(tire_id):
-    st.session_state.cart_items = [item for item in st.session_state.cart_items if item['id'] != tire_id]
-    st.session_state.cart_quantities.pop(tire_id, None)
-    st.session_state.cart_services.pop(tire_id, None)
-    _clear_item_widget_keys(tire_id)
-    st.session_state.cart_count = len(st.session_state.cart_items)
+def remove_from_cart(item_key):
+    st.session_state.cart.remove(item_key)
+    _clear_item_widget_keys(item_key)
 
 def clear_cart():
-    for item in list(st.session_state.cart_items):
-        _clear_item_widget_keys(item['id'])
-    st.session_state.cart_items = []
-    st.session_state.cart_quantities = {}
-    st.session_state.cart_services = {}
-    st.session_state.cart_count = 0
+    for item in st.session_state.cart:
+        _clear_item_widget_keys(item.key)
+    st.session_state.cart.clear()
+
+def _open_saved_quote(quote_id):
+    """Callback: lädt ein gespeichertes Angebot - Widget-Keys vorher leeren, damit sie neu vorbelegt werden"""
+    for item in st.session_state.cart:
+        _clear_item_widget_keys(item.key)
+    for widget_key in CUSTOMER_WIDGET_KEYS.values():
+        st.session_state.pop(widget_key, None)
+    st.session_state.pop('selected_mitarbeiter_key', None)
+    st.session_state.pdf_created = False
+    open_quote(quote_id)
+
+# ================================================================================================
+# KUNDENDATEN-FELDER - EINE TABELLE FÜR STARTWERTE, WIDGET-KEYS UND GESPEICHERTE DATEN
+# ================================================================================================
+CUSTOMER_TEXT_FIELDS = (
+    # Basis-Kundendaten und Adresse
+    'anrede', 'name', 'email', 'strasse', 'hausnummer', 'plz', 'ort',
+    # Geschäftsdaten
+    'kunden_nr', 'auftrags_nr', 'betriebs_nr',
+    # Fahrzeug 1 und 2
+    'kennzeichen', 'modell', 'fahrgestellnummer', 'typ_modellschluessel', 'km_stand',
+    'kennzeichen_2', 'modell_2', 'fahrgestellnummer_2', 'typ_modellschluessel_2', 'km_stand_2',
+    # Optionale Felder
+    'abnehmer_gruppe', 'hu_au_datum', 'abnehmer_gruppe_2', 'hu_au_datum_2',
+)
+CUSTOMER_DATE_FIELDS = (
+    'erstzulassung', 'leistungsdatum', 'fahrzeugannahme',
+    'erstzulassung_2', 'leistungsdatum_2', 'fahrzeugannahme_2',
+)
+CUSTOMER_TOGGLE_FIELDS = ('zusaetzliche_angaben', 'zusaetzliche_angaben_2')
+
+# Feld -> Startwert (Text leer, Datum None, Schalter aus)
+CUSTOMER_DEFAULTS = {
+    **{field: '' for field in CUSTOMER_TEXT_FIELDS},
+    **{field: None for field in CUSTOMER_DATE_FIELDS},
+    **{field: False for field in CUSTOMER_TOGGLE_FIELDS},
+}
+
+# Feld -> Widget-Key; nur die Fahrgestellnummer weicht vom Schema customer_<feld> ab
+CUSTOMER_WIDGET_KEYS = {field: f"customer_{field}" for field in CUSTOMER_DEFAULTS}
+CUSTOMER_WIDGET_KEYS['fahrgestellnummer'] = 'customer_fahrgestell'
+CUSTOMER_WIDGET_KEYS['fahrgestellnummer_2'] = 'customer_fahrgestell_2'
 
 # ================================================================================================
 # SESSION STATE INITIALISIERUNG - ERWEITERT UM NEUE FELDER
 # ================================================================================================
 def init_session_state():
-    # ERWEITERTE KUNDENDATEN mit allen neuen Feldern
+    # Kundendaten aller Felder (siehe CUSTOMER_DEFAULTS)
     if 'customer_data' not in st.session_state:
-        st.session_state.customer_data = {
-            # Basis-Kundendaten (bestehend)
-            'anrede':'','name':'','email':'',
-            # NEUE Adressfelder
-            'strasse':'','hausnummer':'','plz':'','ort':'',
-            # NEUE Geschäftsdaten  
-            'kunden_nr':'','auftrags_nr':'','betriebs_nr':'',
-            # Fahrzeugdaten (bestehend + neu)
-            'kennzeichen':'','modell':'','fahrgestellnummer':'',
-            # NEUE Fahrzeugdaten
-            'typ_modellschluessel':'','erstzulassung':'','km_stand':'',
-            # Fahrzeug 2 (bestehend + neu) 
-            'kennzeichen_2':'','modell_2':'','fahrgestellnummer_2':'',
-            'typ_modellschluessel_2':'','erstzulassung_2':'','km_stand_2':'',
-            # NEUE Optionale Felder
-            'abnehmer_gruppe':'','leistungsdatum':'','fahrzeugannahme':'','hu_au_datum':'',
-            'abnehmer_gruppe_2':'','leistungsdatum_2':'','fahrzeugannahme_2':'','hu_au_datum_2':'',
-            # Zusätzliche Angaben Toggle
-            'zusaetzliche_angaben': False,
-            'zusaetzliche_angaben_2': False
-        }
-
-    # Bestehende Cart Session States (unverändert)
-    if 'cart_items' not in st.session_state: st.session_state.cart_items = []
-    if 'cart_quantities' not in st.session_state: st.session_state.cart_quantities = {}
-    if 'cart_services' not in st.session_state: st.session_state.cart_services = {}
-    if 'cart_count' not in st.session_state: st.session_state.cart_count = 0
+        st.session_state.customer_data = dict(CUSTOMER_DEFAULTS)
+
+    # Warenkorb: Positionen mit Menge und Service-Paketen (gleiches Objekt wie in der Reifen Suche)
+    if 'cart' not in st.session_state: st.session_state.cart = Cart()
 
     if 'pdf_created' not in st.session_state:
         st.session_state.pdf_created = False
@@ -162,71 +184,26 @@ def init_session_state():
     if 'selected_mitarbeiter_info' not in st.session_state:
         st.session_state.selected_mitarbeiter_info = {}
 
-    # ALLE Session State Keys für bestehende + neue Felder
-    # Basis-Kundendaten
-    st.session_state.setdefault('customer_anrede', st.session_state.customer_data.get('anrede',''))
-    st.session_state.setdefault('customer_name', st.session_state.customer_data.get('name',''))
-    st.session_state.setdefault('customer_email', st.session_state.customer_data.get('email',''))
-    # Neue Adressfelder
-    st.session_state.setdefault('customer_strasse', st.session_state.customer_data.get('strasse',''))
-    st.session_state.setdefault('customer_hausnummer', st.session_state.customer_data.get('hausnummer',''))
-    st.session_state.setdefault('customer_plz', st.session_state.customer_data.get('plz',''))
-    st.session_state.setdefault('customer_ort', st.session_state.customer_data.get('ort',''))
-    # Geschäftsdaten
-    st.session_state.setdefault('customer_kunden_nr', st.session_state.customer_data.get('kunden_nr',''))
-    st.session_state.setdefault('customer_auftrags_nr', st.session_state.customer_data.get('auftrags_nr',''))
-    st.session_state.setdefault('customer_betriebs_nr', st.session_state.customer_data.get('betriebs_nr',''))
-    # Fahrzeugdaten 1 (bestehend)
-    st.session_state.setdefault('customer_kennzeichen', st.session_state.customer_data.get('kennzeichen',''))
-    st.session_state.setdefault('customer_modell', st.session_state.customer_data.get('modell',''))
-    st.session_state.setdefault('customer_fahrgestell', st.session_state.customer_data.get('fahrgestellnummer',''))
-    # Fahrzeugdaten 1 (neu)
-    st.session_state.setdefault('customer_typ_modellschluessel', st.session_state.customer_data.get('typ_modellschluessel',''))
-    st.session_state.setdefault('customer_erstzulassung', st.session_state.customer_data.get('erstzulassung',''))
-    st.session_state.setdefault('customer_km_stand', st.session_state.customer_data.get('km_stand',''))
-    
-    # Fahrzeug 2 (bestehend)
-    st.session_state.setdefault('customer_kennzeichen_2', st.session_state.customer_data.get('kennzeichen_2',''))
-    st.session_state.setdefault('customer_modell_2', st.session_state.customer_data.get('modell_2',''))
-    st.session_state.setdefault('customer_fahrgestell_2', st.session_state.customer_data.get('fahrgestellnummer_2',''))
-    # Fahrzeug 2 (neu)
-    st.session_state.setdefault('customer_typ_modellschluessel_2', st.session_state.customer_data.get('typ_modellschluessel_2',''))
-    st.session_state.setdefault('customer_erstzulassung_2', st.session_state.customer_data.get('erstzulassung_2',''))
-    st.session_state.setdefault('customer_km_stand_2', st.session_state.customer_data.get('km_stand_2',''))
-    
-    # Optionale Felder
-    st.session_state.setdefault('customer_abnehmer_gruppe', st.session_state.customer_data.get('abnehmer_gruppe',''))
-    st.session_state.setdefault('customer_leistungsdatum', st.session_state.customer_data.get('leistungsdatum',''))
-    st.session_state.setdefault('customer_fahrzeugannahme', st.session_state.customer_data.get('fahrzeugannahme',''))
-    st.session_state.setdefault('customer_hu_au_datum', st.session_state.customer_data.get('hu_au_datum',''))
-    # Optionale Felder Fahrzeug 2
-    st.session_state.setdefault('customer_abnehmer_gruppe_2', st.session_state.customer_data.get('abnehmer_gruppe_2',''))
-    st.session_state.setdefault('customer_leistungsdatum_2', st.session_state.customer_data.get('leistungsdatum_2',''))
-    st.session_state.setdefault('customer_fahrzeugannahme_2', st.session_state.customer_data.get('fahrzeugannahme_2',''))
-    st.session_state.setdefault('customer_hu_au_datum_2', st.session_state.customer_data.get('hu_au_datum_2',''))
-    
-    # Toggle States
-    st.session_state.setdefault('customer_zusaetzliche_angaben', st.session_state.customer_data.get('zusaetzliche_angaben', False))
-    st.session_state.setdefault('customer_zusaetzliche_angaben_2', st.session_state.customer_data.get('zusaetzliche_angaben_2', False))
+    # Widget-Keys aller Kundendaten-Felder aus customer_data vorbelegen
+    for field, default in CUSTOMER_DEFAULTS.items():
+        st.session_state.setdefault(CUSTOMER_WIDGET_KEYS[field], st.session_state.customer_data.get(field, default))
 
 # ================================================================================================
 # INTERNAL UTILITIES FOR WIDGET-STATE - ANGEPASST FÜR NEUE SERVICE-PAKETE (UNVERÄNDERT)
 # ================================================================================================
-def _ensure_item_defaults(item_id):
-    st.session_state.setdefault(f"qty_{item_id}", st.session_state.cart_quantities.get(item_id, 4))
-    # Service-Pakete sind jetzt Listen von Dictionaries
-    st.session_state.cart_services.setdefault(item_id, [])
+def _ensure_item_defaults(item):
+    st.session_state.setdefault(f"qty_{item.key}", item.menge)
 
-def _update_qty(item_id):
-    st.session_state.cart_quantities[item_id] = st.session_state.get(f"qty_{item_id}", 4)
+def _update_qty(item_key):
+    item = st.session_state.cart.get(item_key)
+    if item is not None:
+        item.menge = st.session_state.get(f"qty_{item_key}", STANDARD_MENGE)
 
 def _clear_item_widget_keys(item_id):
     keys_to_clear = [f"qty_{item_id}"]
     # Alle Service-Package Keys für diesen Reifen löschen
-    service_packages = load_service_packages()
-    for _, package in service_packages.iterrows():
-        key = f"service_{item_id}_{package['Positionsnummer']}"
-        keys_to_clear.append(key)
+    for positionsnummer in get_service_packages().by_positionsnummer:
+        keys_to_clear.append(f"service_{item_id}_{positionsnummer}")
     
     for key in keys_to_clear:
         st.session_state.pop(key, None)
@@ -234,6 +211,45 @@ def _clear_item_widget_keys(item_id):
 # ================================================================================================
 # RENDER FUNCTIONS - MIT SCHÖNER POSITIONS-ABTRENNUNG UND NEUEN SERVICE-PAKETEN (UNVERÄNDERT)
 # ================================================================================================
+def render_open_quotes():
+    """Offene Angebote der gewählten Filiale zum Weiterbearbeiten - ohne Filiale keine Liste"""
+    quote_id = st.session_state.get('quote_id')
+    if quote_id and st.session_state.get('quote_conflict'):
+        st.warning(f"Angebot {quote_id} wurde in einem anderen Fenster geändert. Welcher Stand soll gelten?")
+        col_theirs, col_mine = st.columns(2)
+        with col_theirs:
+            st.button("Gespeicherten Stand laden", key="quote_conflict_load", use_container_width=True,
+                      on_click=_open_saved_quote, args=(quote_id,))
+        with col_mine:
+            st.button("Meinen Stand speichern", key="quote_conflict_keep", use_container_width=True,
+                      on_click=keep_own_quote_version)
+    elif quote_id:
+        st.caption(f"Angebot {quote_id} - wird automatisch gespeichert")
+    filiale = st.session_state.get('selected_filial')
+    if not filiale:
+        st.caption("Offene Angebote werden nach Auswahl der Filiale angezeigt.")
+        return
+    try:
+        quotes = list_quotes(filiale)
+    except sqlite3.Error as e:
+        st.error(f"Fehler beim Laden der offenen Angebote: {e}")
+        return
+    quotes = [quote for quote in quotes if quote['quote_id'] != st.session_state.get('quote_id')]
+    if not quotes:
+        return
+    with st.expander(f"Offene Angebote ({len(quotes)})"):
+        for quote in quotes:
+            col_info, col_open = st.columns([4, 1])
+            with col_info:
+                geaendert = datetime.fromisoformat(quote['geaendert']).strftime("%d.%m.%Y %H:%M")
+                st.markdown(
+                    f"**{quote['kunde'] or 'Ohne Kundenname'}** - {quote['positionen']} Position(en), "
+                    f"{format_cents(quote['netto_cent'])}EUR | {quote['berater'] or 'ohne Ansprechpartner'} | {geaendert}"
+                )
+            with col_open:
+                st.button("Laden", key=f"open_quote_{quote['quote_id']}", use_container_width=True,
+                          on_click=_open_saved_quote, args=(quote['quote_id'],))
+
 def render_empty_cart():
     st.markdown("### Der Warenkorb ist leer")
     st.markdown("Gehe zur **Reifen Suche** und wähle Reifen für dein Angebot aus.")
@@ -242,28 +258,41 @@ def render_empty_cart():
 
 def render_cart_content():
     st.markdown("#### Reifen im Warenkorb")
-    for i, item in enumerate(st.session_state.cart_items, 1):
-        render_cart_item(item, i)
+    # Passende Service-Pakete aller Positionen in einem Durchlauf
+    cart_items = list(st.session_state.cart)
+    available_packages = get_service_packages().for_tires(cart_items)
+    position_slots = []
+    for i, (item, packages) in enumerate(zip(cart_items, available_packages), 1):
+        position_slots.append(render_cart_item(item, i, packages))
         
         # Schöne Abtrennung zwischen Positionen (nur wenn nicht die letzte Position)
-        if i < len(st.session_state.cart_items):
+        if i < len(cart_items):
             st.markdown("---")
 
-def render_cart_item(item, position_number):
+    # Preise erst nach allen Service-Auswahlen - ein Durchlauf für alle Positionen
+    totals = get_cart_totals(st.session_state.cart)
+    for position_number, (item, slot) in enumerate(zip(cart_items, position_slots), 1):
+        reifen_kosten, service_kosten, position_total = totals.positionen[item.key]
+        with slot.container():
+            st.markdown(f"### **Position {position_number} Gesamt: {format_cents(position_total)} EUR**")
+            st.markdown(f"Reifen: {format_cents(reifen_kosten)}EUR + Services: {format_cents(service_kosten)}EUR")
+    return totals
+
+def render_cart_item(item, position_number, available_packages):
     st.markdown(f"### Position {position_number}")
 
-    item_id = item['id']
-    _ensure_item_defaults(item_id)
+    item_id = item.key
+    _ensure_item_defaults(item)
 
     col_info, col_qty, col_services, col_remove = st.columns([3, 1, 2, 1])
 
     with col_info:
-        st.markdown(f"**{item['Reifengröße']}** - {item['Fabrikat']} {item['Profil']}")
-        st.markdown(f"Teilenummer: {item['Teilenummer']} | Einzelpreis: **{item['Preis_EUR']:.2f}EUR**")
-        effi = f" {get_efficiency_emoji(item['Kraftstoffeffizienz'])}{item['Kraftstoffeffizienz']}" if item.get('Kraftstoffeffizienz') else ""
-        nass = f" {get_efficiency_emoji(item['Nasshaftung'])}{item['Nasshaftung']}" if item.get('Nasshaftung') else ""
-        best = f" | {get_stock_display(item.get('Bestand'))}"
-        saz  = f" | Saison: {item.get('Saison','Unbekannt')}"
+        st.markdown(f"**{item.reifengroesse}** - {item.fabrikat} {item.profil}")
+        st.markdown(f"Teilenummer: {item.teilenummer} | Einzelpreis: **{format_cents(item.preis_cent)}EUR**")
+        effi = f" {get_efficiency_emoji(item.kraftstoffeffizienz)}{item.kraftstoffeffizienz}" if item.kraftstoffeffizienz else ""
+        nass = f" {get_efficiency_emoji(item.nasshaftung)}{item.nasshaftung}" if item.nasshaftung else ""
+        best = f" | {get_stock_display(item.bestand)}"
+        saz  = f" | Saison: {item.saison}"
         st.markdown(f"EU-Label:{effi}{nass}{best}{saz}")
 
     with col_qty:
@@ -272,72 +301,34 @@ def render_cart_item(item, position_number):
                         on_change=_update_qty, args=(item_id,))
 
     with col_services:
-        render_item_services(item)
+        render_item_services(item, available_packages)
 
     with col_remove:
         if st.button("Entfernen", key=f"remove_{item_id}", help="Aus Warenkorb entfernen"):
             remove_from_cart(item_id)
             st.rerun()
 
-    # Kosten berechnen mit neuen Service-Paketen
-    quantity = st.session_state.cart_quantities.get(item_id, 4)
-    selected_packages = st.session_state.cart_services.get(item_id, [])
-    reifen_kosten, service_kosten, position_total = calculate_position_total(item, quantity, selected_packages)
-    
-    st.markdown(f"### **Position {position_number} Gesamt: {position_total:.2f} EUR**")
-    st.markdown(f"Reifen: {reifen_kosten:.2f}EUR + Services: {service_kosten:.2f}EUR")
+    # Platz für die Positionssumme - render_cart_content füllt ihn nach allen Positionen
+    return st.empty()
 
-def render_item_services(item):
+def render_item_services(item, available_packages):
     """Rendert Service-Pakete für einen Reifen - KOMPLETT NEUE LOGIK (UNVERÄNDERT)"""
-    item_id = item['id']
-    _ensure_item_defaults(item_id)
+    item_id = item.key
+    _ensure_item_defaults(item)
 
     st.markdown("**Service-Pakete:**")
     
-    # Service-Pakete für diese Reifengröße laden
-    tire_zoll = item['Zoll']
-    service_df = load_service_packages()
-    
-    if service_df.empty:
+    # Pakete kommen aus render_cart_content (gleiche Regeln wie in Reifen Suche)
+    if not get_service_packages().records:
         st.info("Keine Service-Pakete verfügbar.")
         return
     
-    # Verfügbare Pakete filtern (gleiche Logik wie in Reifen Suche)
-    available_packages = []
-    
-    for _, package in service_df.iterrows():
-        package_zoll = package.get('Zoll', None)
-        
-        # Wenn kein Zoll angegeben (None oder NaN), dann für alle Größen verfügbar
-        if pd.isna(package_zoll) or package_zoll is None or package_zoll == '':
-            available_packages.append(package)
-            continue
-            
-        # Zoll-Beschränkungen prüfen
-        package_zoll_str = str(package_zoll).strip()
-        
-        if package_zoll_str == '-17':
-            # Bis 17 Zoll
-            if tire_zoll <= 17:
-                available_packages.append(package)
-        elif package_zoll_str == '18-19':
-            # 18-19 Zoll
-            if 18 <= tire_zoll <= 19:
-                available_packages.append(package)
-        elif package_zoll_str == '20-':
-            # Ab 20 Zoll
-            if tire_zoll >= 20:
-                available_packages.append(package)
-        else:
-            # Unbekannte Zoll-Angabe - vorsichtshalber anzeigen
-            available_packages.append(package)
-    
     if not available_packages:
         st.info("Keine passenden Service-Pakete für diese Reifengröße.")
         return
     
     # Aktuelle Auswahl aus Session State laden
-    current_selection = st.session_state.cart_services.get(item_id, [])
+    current_selection = item.services
     current_positionsnummern = {pkg['positionsnummer'] for pkg in current_selection}
     
     # Service-Pakete als Checkboxen anzeigen
@@ -345,7 +336,6 @@ def render_item_services(item):
     
     for package in available_packages:
         package_key = f"service_{item_id}_{package['Positionsnummer']}"
-        pkg_price = float(package['Preis'])
         
         # Beschreibung mit Hinweis
         description = package['Bezeichnung']
@@ -356,7 +346,7 @@ def render_item_services(item):
         is_selected = package['Positionsnummer'] in current_positionsnummern
         
         checkbox_value = st.checkbox(
-            f"{description} - {pkg_price:.2f}€",
+            f"{description} - {format_cents(package['Preis_Cent'])}€",
             value=is_selected,
             key=package_key
         )
@@ -365,23 +355,23 @@ def render_item_services(item):
             new_selection.append({
                 'positionsnummer': package['Positionsnummer'],
                 'bezeichnung': package['Bezeichnung'],
-                'preis': pkg_price,
+                'preis_cent': package['Preis_Cent'],
                 'hinweis': package['Hinweis'] if pd.notna(package['Hinweis']) else ''
             })
     
-    # Service-Auswahl in Session State speichern
-    st.session_state.cart_services[item_id] = new_selection
+    # Service-Auswahl an der Position speichern
+    item.services = new_selection
 
-def render_price_summary(total, breakdown):
+def render_price_summary(totals):
     st.markdown("---")
     st.markdown("#### Preisübersicht")
     col_breakdown, col_total = st.columns([2, 1])
     with col_breakdown:
-        st.markdown(f"**Reifen-Kosten:** {breakdown['reifen']:.2f}EUR")
-        if breakdown['services']>0: 
-            st.markdown(f"**Service-Pakete:** {breakdown['services']:.2f}EUR")
+        st.markdown(f"**Reifen-Kosten:** {format_cents(totals.reifen)}EUR")
+        if totals.services>0: 
+            st.markdown(f"**Service-Pakete:** {format_cents(totals.services)}EUR")
     with col_total:
-        st.markdown(f"### **GESAMT: {total:.2f}EUR**")
+        st.markdown(f"### **GESAMT: {format_cents(totals.netto)}EUR**")
 
 # ================================================================================================
 # ERWEITERTE KUNDENDATEN EINGABE - KOMPLETT NEUE STRUCTURE
@@ -460,7 +450,7 @@ def render_customer_data():
             st.text_input("HU/AU Datum:", key="customer_hu_au_datum", placeholder="z.B. 06/2027")
 
     # === FAHRZEUG 2 (Optional - nur bei mehreren Positionen sichtbar) ===
-    if len(st.session_state.cart_items) > 1:
+    if len(st.session_state.cart) > 1:
         st.markdown("---")
         st.markdown("##### Fahrzeug 2 (Optional - für separate Positionen)")
         
@@ -496,48 +486,8 @@ def render_customer_data():
 
     # === Session State Update mit ALLEN Feldern ===
     st.session_state.customer_data = {
-        # Basis-Kundendaten
-        'anrede': st.session_state.get('customer_anrede',''),
-        'name': st.session_state.get('customer_name',''),
-        'email': st.session_state.get('customer_email',''),
-        # Neue Adressfelder
-        'strasse': st.session_state.get('customer_strasse',''),
-        'hausnummer': st.session_state.get('customer_hausnummer',''),
-        'plz': st.session_state.get('customer_plz',''),
-        'ort': st.session_state.get('customer_ort',''),
-        # Geschäftsdaten
-        'kunden_nr': st.session_state.get('customer_kunden_nr',''),
-        'auftrags_nr': st.session_state.get('customer_auftrags_nr',''),
-        'betriebs_nr': st.session_state.get('customer_betriebs_nr',''),
-        # Fahrzeugdaten 1 (bestehend)
-        'kennzeichen': st.session_state.get('customer_kennzeichen',''),
-        'modell': st.session_state.get('customer_modell',''),
-        'fahrgestellnummer': st.session_state.get('customer_fahrgestell',''),
-        # Fahrzeugdaten 1 (neu)
-        'typ_modellschluessel': st.session_state.get('customer_typ_modellschluessel',''),
-        'erstzulassung': st.session_state.get('customer_erstzulassung', None),
-        'km_stand': st.session_state.get('customer_km_stand',''),
-        # Fahrzeug 2 (bestehend)
-        'kennzeichen_2': st.session_state.get('customer_kennzeichen_2',''),
-        'modell_2': st.session_state.get('customer_modell_2',''),
-        'fahrgestellnummer_2': st.session_state.get('customer_fahrgestell_2',''),
-        # Fahrzeug 2 (neu)
-        'typ_modellschluessel_2': st.session_state.get('customer_typ_modellschluessel_2',''),
-        'erstzulassung_2': st.session_state.get('customer_erstzulassung_2', None),
-        'km_stand_2': st.session_state.get('customer_km_stand_2',''),
-        # Optionale Felder
-        'abnehmer_gruppe': st.session_state.get('customer_abnehmer_gruppe',''),
-        'leistungsdatum': st.session_state.get('customer_leistungsdatum', None),
-        'fahrzeugannahme': st.session_state.get('customer_fahrzeugannahme', None),
-        'hu_au_datum': st.session_state.get('customer_hu_au_datum',''),
-        # Optionale Felder Fahrzeug 2
-        'abnehmer_gruppe_2': st.session_state.get('customer_abnehmer_gruppe_2',''),
-        'leistungsdatum_2': st.session_state.get('customer_leistungsdatum_2', None),
-        'fahrzeugannahme_2': st.session_state.get('customer_fahrzeugannahme_2', None),
-        'hu_au_datum_2': st.session_state.get('customer_hu_au_datum_2',''),
-        # Toggle States
-        'zusaetzliche_angaben': st.session_state.get('customer_zusaetzliche_angaben', False),
-        'zusaetzliche_angaben_2': st.session_state.get('customer_zusaetzliche_angaben_2', False)
+        field: st.session_state.get(CUSTOMER_WIDGET_KEYS[field], default)
+        for field, default in CUSTOMER_DEFAULTS.items()
     }
 
 # ================================================================================================
@@ -623,7 +573,7 @@ def render_filial_mitarbeiter_selection():
             if mitarbeiter_info.get('email'):
                 st.markdown(f"E-Mail: {mitarbeiter_info.get('email', '')}")
 
-def render_actions(total, breakdown, detected_season):
+def render_actions(totals, detected_season):
     st.markdown("---")
     st.markdown("#### PDF-Angebot erstellen")
 
@@ -635,9 +585,7 @@ def render_actions(total, breakdown, detected_season):
             pdf_data = create_professional_pdf(
                 st.session_state.customer_data,
                 detected_season,
-                st.session_state.cart_items,
-                st.session_state.cart_quantities,
-                st.session_state.cart_services,
+                st.session_state.cart,
                 st.session_state.selected_filial_info,
                 st.session_state.selected_mitarbeiter_info
             )
@@ -691,10 +639,9 @@ def render_actions(total, breakdown, detected_season):
         td_email_text = create_td_email_text(
             st.session_state.customer_data, 
             detected_season,
-            st.session_state.cart_items,
-            st.session_state.cart_quantities
+            st.session_state.cart
         )
-        td_mailto_link = create_td_mailto_link(td_email_text, st.session_state.cart_items)
+        td_mailto_link = create_td_mailto_link(td_email_text, st.session_state.cart)
         
         st.link_button("🔍 Reifen über TD anfragen", td_mailto_link,
                        use_container_width=True, type="secondary",
@@ -702,6 +649,7 @@ def render_actions(total, breakdown, detected_season):
 
     with col4:
         if st.button("Warenkorb leeren", use_container_width=True, type="secondary"):
+            close_quote_session(STATUS_VERWORFEN)
             clear_cart()
             st.session_state.pdf_created = False
             st.success("Warenkorb geleert!")
@@ -716,8 +664,9 @@ def render_actions(total, breakdown, detected_season):
     
     with col10:
         if st.button("Reifen ausbuchen", use_container_width=True, type="primary"):
-            if st.session_state.cart_items:
+            if st.session_state.cart:
                 st.success("Reifen erfolgreich ausgebucht!")
+                close_quote_session(STATUS_ABGESCHLOSSEN)
                 clear_cart()
                 st.session_state.pdf_created = False
                 st.rerun()
@@ -728,6 +677,8 @@ def render_actions(total, breakdown, detected_season):
 # MAIN (ANGEPASST - KEIN ANGEBOT-SZENARIO MEHR)
 # ================================================================================================
 def main():
+    # Gespeichertes Angebot aus der URL zurückholen (Neuladen, Server-Neustart)
+    restore_quote_session()
     init_session_state()
 
     # Logo Header ganz oben - EINHEITLICH WIE REIFEN-SUCHE
@@ -742,25 +693,30 @@ def main():
     # Fester Abstand NACH dem Logo (robust gegen Margin-Collapse)
     st.markdown('<div class="logo-spacer"></div>', unsafe_allow_html=True)
 
-    if not st.session_state.cart_items:
+    render_open_quotes()
+
+    if not st.session_state.cart:
+        save_quote_session()
         render_empty_cart()
         return
 
-    render_cart_content()
-    total, breakdown = get_cart_total(
-        st.session_state.cart_items, 
-        st.session_state.cart_quantities, 
-        st.session_state.cart_services
-    )
-    render_price_summary(total, breakdown)
+    totals = render_cart_content()
+    render_price_summary(totals)
     render_customer_data()
     
     # Filial- und Mitarbeiterauswahl mit festen Datenstrukturen
     render_filial_mitarbeiter_selection()
     
     # ANGEBOT-SZENARIO ENTFERNT - direkter Aufruf mit detected_season
-    detected = detect_cart_season(st.session_state.cart_items)
-    render_actions(total, breakdown, detected)
+    detected = detect_cart_season(st.session_state.cart)
+    render_actions(totals, detected)
+
+    # Angebot speichern - nur wenn sich Warenkorb oder Kundendaten geändert haben
+    conflict_before = st.session_state.get('quote_conflict', False)
+    save_quote_session()
+    if st.session_state.get('quote_conflict') and not conflict_before:
+        # Konflikt gerade erkannt - neu zeichnen, damit die Auswahl oben erscheint
+        st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
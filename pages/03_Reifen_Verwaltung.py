@@ -5,6 +5,16 @@ from pathlib import Path
 from datetime import datetime
 import numpy as np
 
+from utils.catalog import (
+    get_saison_from_teilenummer, derive_saison,
+    get_catalog, get_master_df, load_master_data, save_master_data, editable_copy,
+    load_service_packages, save_service_packages,
+    find_excel_vorlagen, get_file_hash, load_excel_vorlagen_table
+)
+from utils.tire_index import BitmapIndex, SearchIndex
+from utils.service_rules import unsupported_rules
+from utils.pdf_generator import render_pdf_cache_stats
+
 # Page Config
 st.set_page_config(
     page_title="Reifen Verwaltung - Ramsperger",
@@ -12,14 +22,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# ================================================================================================
-# BASISKONFIGURATION - KORRIGIERTER DATEINAME
-# ================================================================================================
-BASE_DIR = Path("data")
-MASTER_CSV = BASE_DIR / "Ramsperger_Winterreifen_20250826_160010.csv"
-EXCEL_VORLAGEN = BASE_DIR / "2025-07-29_ReifenPremium_Winterreifen_2025-26.xlsx"
-SERVICES_CONFIG_CSV = BASE_DIR / "ramsperger_services_config.csv"
-
 # ================================================================================================
 # CUSTOM CSS - ERWEITERT FÜR MULTI-SAISON
 # ================================================================================================
@@ -256,22 +258,6 @@ st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 # ================================================================================================
 # HELPER FUNCTIONS FÜR SAISON
 # ================================================================================================
-def get_saison_from_teilenummer(teilenummer):
-    """Ermittelt Saison basierend auf Teilenummer"""
-    if pd.isna(teilenummer) or teilenummer == '':
-        return "Unbekannt"
-    
-    teilenummer_str = str(teilenummer).strip().upper()
-    
-    if teilenummer_str.startswith('ZTW'):
-        return "Winter"
-    elif teilenummer_str.startswith('ZTR'):
-        return "Ganzjahres"
-    elif teilenummer_str.startswith('ZTS'):
-        return "Sommer"
-    else:
-        return "Unbekannt"
-
 def get_saison_badge_html(saison):
     """Erstellt HTML Badge für Saison-Anzeige"""
     if saison == "Winter":
@@ -334,6 +320,10 @@ def init_session_state():
         st.session_state.df_filtered = None
     if 'df_working' not in st.session_state:
         st.session_state.df_working = None
+    if 'df_original_bitmaps' not in st.session_state:
+        st.session_state.df_original_bitmaps = None
+    if 'df_original_search' not in st.session_state:
+        st.session_state.df_original_search = None
     if 'file_uploaded' not in st.session_state:
         st.session_state.file_uploaded = False
     if 'selected_indices' not in st.session_state:
@@ -354,32 +344,6 @@ def init_session_state():
 # ================================================================================================
 # PAKET KONFIGURATION (NEUE FUNKTIONEN FÜR PAKET-SYSTEM)
 # ================================================================================================
-@st.cache_data
-def load_service_packages():
-    """Lädt die Service-Pakete aus der CSV - verwendet die neue Struktur"""
-    try:
-        if SERVICES_CONFIG_CSV.exists():
-            df = pd.read_csv(SERVICES_CONFIG_CSV, encoding='utf-8')
-            return df
-        else:
-            # Fallback falls CSV nicht existiert
-            return pd.DataFrame(columns=['Positionsnummer', 'Bezeichnung', 'Teilenummer_Detail', 'Preis', 'Hinweis', 'Zoll'])
-    except Exception as e:
-        st.error(f"Fehler beim Laden der Service-Pakete: {e}")
-        return pd.DataFrame(columns=['Positionsnummer', 'Bezeichnung', 'Teilenummer_Detail', 'Preis', 'Hinweis', 'Zoll'])
-
-def save_service_packages(packages_df):
-    """Speichert die Service-Pakete in die CSV - neue Struktur"""
-    try:
-        SERVICES_CONFIG_CSV.parent.mkdir(parents=True, exist_ok=True)
-        packages_df.to_csv(SERVICES_CONFIG_CSV, index=False, encoding='utf-8')
-        # Cache leeren damit neue Daten geladen werden
-        load_service_packages.clear()
-        return True
-    except Exception as e:
-        st.error(f"Fehler beim Speichern der Service-Pakete: {e}")
-        return False
-
 def create_service_packages_export():
     """Erstellt CSV-Export der aktuellen Service-Pakete"""
     try:
@@ -401,68 +365,10 @@ def create_service_packages_export():
 # ================================================================================================
 # DATENBANK FUNKTIONEN (VEREINFACHT - NUR MASTER CSV)
 # ================================================================================================
-def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    """Bereinigt und normalisiert DataFrame"""
-    if df.empty:
-        return df
-    
-    # Preis-Spalte bereinigen - ERWEITERT FÜR NEUE EXCEL-STRUKTUR
-    if "Preis_EUR" in df.columns:
-        if df["Preis_EUR"].dtype == object:
-            df["Preis_EUR"] = (
-                df["Preis_EUR"]
-                .astype(str)
-                .str.replace(",", ".", regex=False)
-                .str.replace("€", "", regex=False)
-                .str.strip()
-            )
-        df["Preis_EUR"] = pd.to_numeric(df["Preis_EUR"], errors="coerce")
-    elif "Preis Leasing netto" in df.columns:
-        # Neue Excel-Datei hat diese Spalte
-        df["Preis_EUR"] = pd.to_numeric(df["Preis Leasing netto"], errors="coerce")
-
-    for c in ["Breite", "Hoehe", "Zoll"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce").astype("Int64")
-
-    if "Bestand" in df.columns:
-        df["Bestand"] = pd.to_numeric(df["Bestand"], errors="coerce")
-
-    for c in ["Fabrikat", "Profil", "Kraftstoffeffizienz", "Nasshaftung", 
-              "Loadindex", "Speedindex", "Teilenummer"]:
-        if c not in df.columns:
-            df[c] = pd.NA
-    
-    # Saison-Spalte hinzufügen wenn nicht vorhanden
-    if "Saison" not in df.columns:
-        df["Saison"] = df["Teilenummer"].apply(get_saison_from_teilenummer)
-
-    df = df.dropna(subset=["Preis_EUR", "Breite", "Hoehe", "Zoll"], how="any")
-    if not df.empty:
-        df["Breite"] = df["Breite"].astype(int)
-        df["Hoehe"] = df["Hoehe"].astype(int)
-        df["Zoll"] = df["Zoll"].astype(int)
-
-    return df
-
-@st.cache_data(show_spinner=False)
-def load_master_csv() -> pd.DataFrame:
-    """Lädt die Master-CSV"""
-    if not MASTER_CSV.exists():
-        return pd.DataFrame()
-
-    df = pd.read_csv(MASTER_CSV, encoding='utf-8')
-    return clean_dataframe(df)
-
 def save_to_master_csv(df):
     """Speichert DataFrame direkt in die Master-CSV"""
     try:
-        MASTER_CSV.parent.mkdir(parents=True, exist_ok=True)
-        df.to_csv(MASTER_CSV, index=False, encoding='utf-8')
-        
-        # Cache leeren damit neue Daten geladen werden
-        load_master_csv.clear()
-        
+        save_master_data(df)
         return True
     except Exception as e:
         st.error(f"Fehler beim Speichern in Master-CSV: {e}")
@@ -471,7 +377,7 @@ def save_to_master_csv(df):
 def update_master_csv_with_tire(tire_data):
     """Aktualisiert einzelnen Reifen in Master-CSV"""
     try:
-        master_df = load_master_csv()
+        master_df = load_master_data()
         
         if master_df.empty:
             # Neue CSV erstellen
@@ -506,70 +412,38 @@ def check_duplicate_in_master(teilenummer):
     if not teilenummer:
         return False
     
-    master_df = load_master_csv()
-    if master_df.empty or 'Teilenummer' not in master_df.columns:
-        return False
-    
-    return teilenummer in master_df['Teilenummer'].values
+    return get_catalog().has_teilenummer(teilenummer)
 
 # ================================================================================================
 # EXCEL DATEN LADEN (VORLAGEN) - AUTOMATISCHER LOAD MIT KORRIGIERTEM DATEINAMEN
 # ================================================================================================
 @st.cache_data(show_spinner=False)
+def _load_excel_vorlagen_cached(excel_path_str, file_hash) -> pd.DataFrame:
+    """Cache pro Excel-Inhalt - eine neue Datei erzeugt einen neuen Eintrag"""
+    return load_excel_vorlagen_table(Path(excel_path_str), file_hash)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _build_vorlagen_indexes(excel_path_str, file_hash):
+    """Bitmap- und Suchindex pro Excel-Inhalt - einmal für alle Sessions"""
+    df = _load_excel_vorlagen_cached(excel_path_str, file_hash)
+    return BitmapIndex(df), SearchIndex(df)
+
+def load_excel_vorlagen_indexes():
+    """Indizes passend zu load_excel_vorlagen() - (None, None) ohne Excel-Datei"""
+    excel_path = find_excel_vorlagen()
+    if not excel_path.exists():
+        return None, None
+    return _build_vorlagen_indexes(str(excel_path), get_file_hash(excel_path))
+
 def load_excel_vorlagen() -> pd.DataFrame:
     """Lädt die Excel-Vorlagen für neue Reifen"""
-    if not EXCEL_VORLAGEN.exists():
-        st.error(f"Excel-Datei nicht gefunden: {EXCEL_VORLAGEN}")
+    excel_path = find_excel_vorlagen()
+    if not excel_path.exists():
+        st.error(f"Excel-Datei nicht gefunden: {excel_path}")
         return pd.DataFrame()
     
     try:
-        df = pd.read_excel(EXCEL_VORLAGEN, sheet_name=0)
-        
-        # Spalten-Namen bereinigen
-        df.columns = df.columns.str.replace(r'\r\n', ' ', regex=True).str.strip()
-        
-        # Dimension zusammenbauen
-        df['Dimension'] = (
-            df['Breite'].astype(str) + '/' + 
-            df['Hoehe'].astype(str) + ' ' + 
-            df['R'].astype(str) + df['Zoll'].astype(str) + ' ' + 
-            df['Loadindex'].astype(str) + df['Speedindex'].astype(str)
-        )
-        
-        # Runflat-Kennzeichnung
-        df['Dimension'] = df.apply(
-            lambda row: row['Dimension'] + (' RF' if pd.notna(row['RF']) and row['RF'] != '' else ''), 
-            axis=1
-        )
-        
-        # Preis-Spalte finden
-        preis_col = None
-        for col in df.columns:
-            if 'Preis' in col and 'netto' in col:
-                preis_col = col
-                break
-        
-        if preis_col:
-            df['Preis_EUR'] = pd.to_numeric(df[preis_col], errors='coerce')
-        else:
-            df['Preis_EUR'] = 0.0
-        
-        # Spalten umbenennen/erstellen
-        required_cols = ['Dimension', 'Fabrikat', 'Profil', 'Teilenummer', 'Preis_EUR', 
-                        'Zoll', 'Breite', 'Hoehe', 'RF', 'Kennzeichen']
-        for col in required_cols:
-            if col not in df.columns:
-                df[col] = ''
-        
-        # Nur relevante Spalten
-        df = df[['Dimension', 'Fabrikat', 'Profil', 'Teilenummer', 'Preis_EUR', 'Zoll', 
-                'Breite', 'Hoehe', 'RF', 'Kennzeichen', 'Speedindex', 'Loadindex']]
-        df = df.fillna('')
-        
-        # Saison basierend auf Teilenummer hinzufügen
-        df['Saison'] = df['Teilenummer'].apply(get_saison_from_teilenummer)
-        
-        return df
+        return _load_excel_vorlagen_cached(str(excel_path), get_file_hash(excel_path))
     except Exception as e:
         st.error(f"Fehler beim Laden der Excel-Datei: {e}")
         return pd.DataFrame()
@@ -669,44 +543,56 @@ def add_new_columns(df):
     if 'Geräuschklasse' not in df.columns:
         df['Geräuschklasse'] = pd.Series([70] * len(df), dtype='float64')
     if 'Saison' not in df.columns:
-        df['Saison'] = df['Teilenummer'].apply(get_saison_from_teilenummer)
+        df['Saison'] = derive_saison(df['Teilenummer'])
     
     return df
 
 # ================================================================================================
 # FILTER FUNKTIONEN - ERWEITERT FÜR SAISON - FIXED INDEX BUG
 # ================================================================================================
+def search_mask(df, search_terms):
+    """Teilstring-Suche ohne Index - ODER über alle Begriffe in Teilenummer, Fabrikat und Profil"""
+    mask = np.zeros(len(df), dtype=bool)
+    for search_term in search_terms:
+        for col in ('Teilenummer', 'Fabrikat', 'Profil'):
+            mask |= df[col].str.upper().str.contains(search_term, na=False, regex=False).to_numpy(dtype=bool)
+    return mask
+
 def apply_filters(df, hersteller_filter, zoll_filter, preis_range, runflat_filter, 
                  breite_filter, hoehe_filter, teilenummer_search, speed_filter, 
-                 saison_filter="alle", stock_filter="alle"):
-    """Wendet Sidebar-Filter an - erweitert um Saison - FIXED INDEX BUG"""
-    filtered_df = df.copy()
-    
+                 saison_filter="alle", stock_filter="alle", bitmaps=None, search_index=None):
+    """Wendet Sidebar-Filter an - Kategorien per Bitmap-Index (UND/ODER), danach Preis und Suche"""
+    if bitmaps is None or bitmaps.n_rows != len(df):
+        bitmaps = BitmapIndex(df)
+    if search_index is not None and search_index.n_rows > len(df):
+        search_index = None
+    
+    bits = bitmaps.full
     if hersteller_filter and len(hersteller_filter) > 0:
-        filtered_df = filtered_df[filtered_df['Fabrikat'].isin(hersteller_filter)]
-    
+        bits = bits & bitmaps.any_of('Fabrikat', hersteller_filter)
     if zoll_filter and len(zoll_filter) > 0:
-        filtered_df = filtered_df[filtered_df['Zoll'].isin(zoll_filter)]
-    
-    filtered_df = filtered_df[
-        (filtered_df['Preis_EUR'] >= preis_range[0]) & 
-        (filtered_df['Preis_EUR'] <= preis_range[1])
-    ]
-    
+        bits = bits & bitmaps.any_of('Zoll', zoll_filter)
     if runflat_filter == "Nur Runflat":
-        filtered_df = filtered_df[filtered_df['RF'] != '']
+        bits = bits & ~bitmaps.value('RF', '')
     elif runflat_filter == "Ohne Runflat":
-        filtered_df = filtered_df[filtered_df['RF'] == '']
-    
+        bits = bits & bitmaps.value('RF', '')
     if breite_filter and len(breite_filter) > 0:
-        filtered_df = filtered_df[filtered_df['Breite'].isin(breite_filter)]
-    
+        bits = bits & bitmaps.any_of('Breite', breite_filter)
     if hoehe_filter and len(hoehe_filter) > 0:
-        filtered_df = filtered_df[filtered_df['Hoehe'].isin(hoehe_filter)]
+        bits = bits & bitmaps.any_of('Hoehe', hoehe_filter)
     
     # SAISON-FILTER
     if saison_filter and saison_filter.lower() != "alle":
-        filtered_df = filtered_df[filtered_df['Saison'] == saison_filter]
+        bits = bits & bitmaps.value('Saison', saison_filter)
+    
+    positions = bitmaps.to_positions(bits)
+    filtered_df = df.iloc[positions]
+    preis_ok = (
+        (filtered_df['Preis_EUR'] >= preis_range[0]) & 
+        (filtered_df['Preis_EUR'] <= preis_range[1])
+    ).to_numpy(dtype=bool)
+    positions = positions[preis_ok]
+    filtered_df = filtered_df[preis_ok]
     
     # TEILENUMMER-SUCHE - FIXED INDEX BUG
     if teilenummer_search and teilenummer_search.strip() != "":
@@ -716,21 +602,20 @@ def apply_filters(df, hersteller_filter, zoll_filter, preis_range, runflat_filte
             # Index zurücksetzen BEVOR die Mask erstellt wird
             filtered_df = filtered_df.reset_index(drop=True)
             
-            # Jetzt ist der Index 0, 1, 2, 3... und die Mask passt
-            mask = pd.Series([False] * len(filtered_df))
-            
-            for search_term in search_terms:
-                term_mask = (
-                    filtered_df['Teilenummer'].str.upper().str.contains(search_term, na=False, regex=False) |
-                    filtered_df['Fabrikat'].str.upper().str.contains(search_term, na=False, regex=False) |
-                    filtered_df['Profil'].str.upper().str.contains(search_term, na=False, regex=False)
-                )
-                mask = mask | term_mask
-            
+            if search_index is not None:
+                # Suchindex deckt die Vorlagen ab, angehängte leere Vorlagen werden direkt durchsucht
+                mask = search_index.search(search_terms)
+                if search_index.n_rows < len(df):
+                    mask = np.concatenate([mask, search_mask(df.iloc[search_index.n_rows:], search_terms)])
+                mask = mask[positions]
+            else:
+                mask = search_mask(filtered_df, search_terms)
+            positions = positions[mask]
             filtered_df = filtered_df[mask]
     
     if speed_filter and len(speed_filter) > 0:
-        filtered_df = filtered_df[filtered_df['Speedindex'].isin(speed_filter)]
+        speed_ok = bitmaps.to_mask(bitmaps.any_of('Speedindex', speed_filter))[positions]
+        filtered_df = filtered_df[speed_ok]
     
     return filtered_df
 
@@ -763,7 +648,7 @@ def get_stock_statistics(df):
 def create_github_export():
     """Erstellt GitHub-Export der Master-CSV"""
     try:
-        master_df = load_master_csv()
+        master_df = get_master_df()
         
         if master_df.empty:
             return None
@@ -838,6 +723,13 @@ def render_package_management():
     
     st.markdown(f"**{len(packages_df)} Service-Pakete gefunden:**")
     
+    # Regeln auf Spalten ohne Katalog-Gegenstück (RF) greifen nicht und werden beim Speichern verworfen
+    for column, positionsnummern in unsupported_rules(packages_df).items():
+        st.error(
+            f"Regeln auf '{column}' werden nicht unterstützt und nicht angewendet "
+            f"(Pakete: {', '.join(positionsnummern)}). Beim Speichern werden sie entfernt."
+        )
+    
     # Service-Pakete als bearbeitbare Tabelle anzeigen
     edited_packages = {}
     
@@ -888,7 +780,10 @@ def render_package_management():
                 # Zoll-Beschränkung mit Optionen
                 zoll_options = ["", "-17", "18-19", "20-"]
                 current_zoll = str(package['Zoll']) if pd.notna(package['Zoll']) else ""
-                zoll_index = zoll_options.index(current_zoll) if current_zoll in zoll_options else 0
+                # Eigene Regeln aus der CSV (z.B. "<=15" oder "15, 18-19") beim Speichern erhalten
+                if current_zoll not in zoll_options:
+                    zoll_options.append(current_zoll)
+                zoll_index = zoll_options.index(current_zoll)
                 
                 new_zoll = st.selectbox(
                     "Reifengrößen-Beschränkung:",
@@ -996,7 +891,7 @@ def render_stock_management():
     st.markdown("#### 📦 Bestandsmanagement & Nachbestellungen")
     st.markdown("Überblick über Lagerbestände und automatische Nachbestelllisten.")
     
-    master_data = load_master_csv()
+    master_data = get_master_df()
     
     if master_data.empty:
         st.warning("Keine Daten für Bestandsanalysis verfügbar.")
@@ -1043,6 +938,8 @@ def render_reifen_content():
             df_excel = load_excel_vorlagen()
             if not df_excel.empty:
                 st.session_state.df_original = df_excel.copy()
+                (st.session_state.df_original_bitmaps,
+                 st.session_state.df_original_search) = load_excel_vorlagen_indexes()
                 st.session_state.file_uploaded = True
                 st.session_state.filter_applied = False
                 st.session_state.selection_confirmed = False
@@ -1168,6 +1065,8 @@ def render_reifen_content():
                 if bulk_teilenummern:
                     df_with_bulk = load_excel_with_bulk_teilenummern(bulk_teilenummern)
                     working_df = df_with_bulk
+                    # Leere Vorlagen werden hinten angehängt - Indizes der aktuellen Excel-Datei passen auf den Anfang
+                    bitmaps, search_index = load_excel_vorlagen_indexes()
                     
                     # Info über hinzugefügte leere Vorlagen
                     excel_count = len(working_df[working_df['Fabrikat'] != '']) if 'Fabrikat' in working_df.columns else 0
@@ -1177,12 +1076,14 @@ def render_reifen_content():
                         st.info(f"📝 {missing_count} unbekannte Teilenummern als leere Vorlagen hinzugefügt!")
                 else:
                     working_df = df_orig
+                    bitmaps = st.session_state.df_original_bitmaps
+                    search_index = st.session_state.df_original_search
                 
-                # Filter anwenden
+                # Filter anwenden - Indizes der geladenen Vorlagen wiederverwenden
                 filtered_df = apply_filters(
                     working_df, hersteller_filter, zoll_filter, preis_range, 
                     runflat_filter, breite_filter, hoehe_filter, teilenummer_search, 
-                    speed_filter, saison_filter
+                    speed_filter, saison_filter, bitmaps=bitmaps, search_index=search_index
                 )
                 
                 st.session_state.df_filtered = filtered_df
@@ -1426,7 +1327,7 @@ def render_reifen_content():
             # Auswahl bestätigen
             if len(st.session_state.selected_indices) > 0:
                 if st.button("Auswahl bestätigen & weiter zu Schritt 3", use_container_width=True, type="primary"):
-                    st.session_state.df_selected = df_filtered.loc[st.session_state.selected_indices].copy()
+                    st.session_state.df_selected = editable_copy(df_filtered.loc[st.session_state.selected_indices])
                     st.session_state.df_selected = add_new_columns(st.session_state.df_selected)
                     st.session_state.df_working = st.session_state.df_selected.copy()
                     st.session_state.selection_confirmed = True
@@ -1825,6 +1726,9 @@ def render_reifen_tab():
         if st.button("🗄️ Datenbank Verwaltung", use_container_width=True, type="secondary"):
             st.switch_page("pages/04_Datenbank_Verwaltung.py")
         
+        st.markdown("---")
+        render_pdf_cache_stats()
+        
         # Modus-Auswahl
         st.markdown("---")
         st.header("Verwaltungsmodus")
@@ -2,7 +2,10 @@ import streamlit as st
 import pandas as pd
 import io
 from datetime import datetime
-from pathlib import Path
+
+from utils.catalog import get_catalog, get_master_df, save_master_data, editable_copy, price_to_float
+from utils.tire_index import SearchIndex
+from utils.pdf_generator import render_pdf_cache_stats
 
 # Page Config
 st.set_page_config(
@@ -11,12 +14,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# ================================================================================================
-# BASISKONFIGURATION
-# ================================================================================================
-BASE_DIR = Path("data")
-MASTER_CSV = BASE_DIR / "Ramsperger_Winterreifen_20250826_160010.csv"
-
 # ================================================================================================
 # CUSTOM CSS
 # ================================================================================================
@@ -163,61 +160,13 @@ def get_stock_display(stock_value):
     except:
         return "❓ unbekannt"
 
-def clean_dataframe(df):
-    """Bereinigt und normalisiert DataFrame"""
-    if df.empty:
-        return df
-    
-    # Preis bereinigen
-    if "Preis_EUR" in df.columns:
-        if df["Preis_EUR"].dtype == object:
-            df["Preis_EUR"] = (
-                df["Preis_EUR"]
-                .astype(str)
-                .str.replace(",", ".", regex=False)
-                .str.replace("€", "", regex=False)
-                .str.strip()
-            )
-        df["Preis_EUR"] = pd.to_numeric(df["Preis_EUR"], errors="coerce")
-    
-    # Dimensionen bereinigen
-    for c in ["Breite", "Hoehe", "Zoll"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce").astype("Int64")
-    
-    # Bestand als Float (negative Werte erlaubt)
-    if "Bestand" in df.columns:
-        df["Bestand"] = pd.to_numeric(df["Bestand"], errors="coerce")
-    
-    # Fehlende Spalten ergänzen
-    required_cols = ["Fabrikat", "Profil", "Kraftstoffeffizienz", "Nasshaftung", 
-                    "Loadindex", "Speedindex", "Teilenummer", "Geräuschklasse"]
-    for col in required_cols:
-        if col not in df.columns:
-            df[col] = pd.NA
-    
-    # Leere Zeilen entfernen
-    df = df.dropna(subset=["Preis_EUR", "Breite", "Hoehe", "Zoll"], how="any")
-    
-    if not df.empty:
-        df["Breite"] = df["Breite"].astype(int)
-        df["Hoehe"] = df["Hoehe"].astype(int)
-        df["Zoll"] = df["Zoll"].astype(int)
-    
-    return df
-
 # ================================================================================================
 # DATENBANK FUNKTIONEN
 # ================================================================================================
-@st.cache_data(show_spinner=False)
 def load_master_database():
-    """Lädt die Master-Datenbank"""
-    if not MASTER_CSV.exists():
-        return pd.DataFrame()
-    
+    """Lädt die Master-Datenbank aus dem geteilten Katalog (nur lesen)"""
     try:
-        df = pd.read_csv(MASTER_CSV, encoding='utf-8')
-        return clean_dataframe(df)
+        return get_master_df()
     except Exception as e:
         st.error(f"Fehler beim Laden der Datenbank: {e}")
         return pd.DataFrame()
@@ -225,12 +174,7 @@ def load_master_database():
 def save_master_database(df):
     """Speichert die Master-Datenbank"""
     try:
-        MASTER_CSV.parent.mkdir(parents=True, exist_ok=True)
-        df.to_csv(MASTER_CSV, index=False, encoding='utf-8')
-        
-        # Cache leeren
-        load_master_database.clear()
-        
+        save_master_data(df)
         return True
     except Exception as e:
         st.error(f"Fehler beim Speichern der Datenbank: {e}")
@@ -238,7 +182,7 @@ def save_master_database(df):
 
 def update_single_tire(teilenummer, updated_data):
     """Aktualisiert einen einzelnen Reifen"""
-    df = load_master_database()
+    df = editable_copy(load_master_database())
     
     if df.empty:
         return False
@@ -257,7 +201,7 @@ def update_single_tire(teilenummer, updated_data):
 
 def remove_tire(teilenummer):
     """Entfernt einen Reifen"""
-    df = load_master_database()
+    df = editable_copy(load_master_database())
     
     if df.empty:
         return False
@@ -291,13 +235,11 @@ def create_download_csv(df):
 
 def create_download_excel(df):
     """Erstellt Excel für Download"""
-    df_download = df.copy()
+    df_download = editable_copy(df)
     
     # Formatierung
     if 'Bestand' in df_download.columns:
-        df_download['Bestand'] = df_download['Bestand'].fillna('').apply(
-            lambda x: int(x) if pd.notnull(x) and x != '' else None
-        )
+        df_download['Bestand'] = df_download['Bestand'].astype(object).where(df_download['Bestand'].notna(), None)
     
     if 'Geräuschklasse' in df_download.columns:
         df_download['Geräuschklasse'] = df_download['Geräuschklasse'].fillna('').apply(
@@ -628,7 +570,7 @@ def render_single_tire_editor(df):
             "Preis (EUR):",
             min_value=0.0,
             max_value=2000.0,
-            value=float(selected_row['Preis_EUR']),
+            value=price_to_float(selected_row['Preis_EUR']),
             step=0.01,
             key="db_edit_preis"
         )
@@ -773,6 +715,13 @@ def render_export_functions(df, filtered_df):
 # ================================================================================================
 # MAIN FUNCTION
 # ================================================================================================
+def get_search_index(df):
+    """Suchindex des Katalogs - nur für abweichende DataFrames neu aufgebaut"""
+    catalog = get_catalog()
+    if catalog.df is df:
+        return catalog.search_index
+    return SearchIndex(df, fields=("Teilenummer",))
+
 def main():
     init_session_state()
     
@@ -807,6 +756,9 @@ def main():
         if st.button("🔧 Reifen Verwaltung", use_container_width=True):
             st.switch_page("pages/03_Reifen_Verwaltung.py")
         
+        st.markdown("---")
+        render_pdf_cache_stats()
+        
         st.markdown("---")
         st.header("🔍 Datenbank Filter")
         
@@ -822,7 +774,7 @@ def main():
             "Teilenummer suchen:",
             placeholder="z.B. ZTW185655TSZ00, ZTW206606HSZ00, ZTW205556HC870",
             key="db_search",
-            help="Mehrere Teilenummern mit Komma trennen"
+            help="Mehrere Teilenummern mit Komma trennen, * am Ende sucht nach Präfix (z.B. ZTW20555*)"
         )
         
         # Bestandsfilter
@@ -861,14 +813,9 @@ def main():
         search_terms = [term.strip().upper() for term in db_search.split(',') if term.strip()]
         
         if search_terms:
-            mask = pd.Series([False] * len(filtered_df))
-            
-            for search_term in search_terms:
-                # Nur in Teilenummer suchen
-                term_mask = filtered_df['Teilenummer'].str.upper().str.contains(search_term, na=False, regex=False)
-                mask = mask | term_mask
-            
-            filtered_df = filtered_df[mask]
+            # Nur in Teilenummer suchen - Treffer als Maske über die gesamte Datenbank
+            found = get_search_index(current_df).search(search_terms, fields=("Teilenummer",))
+            filtered_df = filtered_df[found[current_df.index.get_indexer(filtered_df.index)]]
     
     # Info über Datenbank
     st.markdown("""
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests importieren die App-Module wie die Seiten: utils.* relativ zum Projektordner
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
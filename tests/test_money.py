@@ -0,0 +1,133 @@
+import base64
+import re
+import zlib
+from decimal import Decimal, ROUND_HALF_UP
+
+from hypothesis import given, settings, strategies as st
+
+from utils.cart import Cart, CartItem
+from utils.money import to_cents, netto_cents, mwst_cents, format_cents, format_cents_german
+from utils.pdf_generator import get_cart_totals, create_professional_pdf
+
+# ================================================================================================
+# ZUFÄLLIGE WARENKÖRBE
+# ================================================================================================
+services = st.lists(
+    st.builds(
+        lambda nummer, preis_cent: {
+            'positionsnummer': f"Z{nummer}", 'bezeichnung': f"Paket {nummer}",
+            'preis_cent': preis_cent, 'hinweis': '',
+        },
+        st.integers(1000, 9999), st.integers(0, 50_000),
+    ),
+    max_size=3,
+)
+
+positions = st.lists(
+    st.tuples(st.integers(1, 500_000), st.integers(1, 8), services),
+    min_size=1, max_size=6,
+)
+
+def build_cart(rows):
+    cart = Cart()
+    for key, (preis_cent, menge, pakete) in enumerate(rows):
+        cart.add(CartItem(
+            key, f"T{key}", "205/55 R16", "Fabrikat", "Profil", preis_cent, 16,
+            4, "B", "A", "Winter", menge=menge, services=pakete,
+        ))
+    return cart
+
+def reference_netto(brutto_cents):
+    """Netto zu Brutto mit Decimal - unabhängige Vergleichsrechnung zu netto_cents()"""
+    return int((Decimal(brutto_cents) / Decimal("1.19")).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+# ================================================================================================
+# GRUNDFUNKTIONEN
+# ================================================================================================
+@given(st.integers(0, 10**9))
+def test_netto_cents_matches_decimal_rounding(brutto_cents):
+    assert netto_cents(brutto_cents) == reference_netto(brutto_cents)
+
+@given(st.integers(0, 10**9))
+def test_mwst_is_19_percent_rounded_half_up(netto):
+    expected = (Decimal(netto) * Decimal("0.19")).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+    assert mwst_cents(netto) == int(expected)
+
+@given(st.integers(-10**9, 10**9))
+def test_formatting_round_trips_through_to_cents(cents):
+    assert to_cents(format_cents(cents)) == cents
+    assert to_cents(format_cents_german(cents).replace(".", "")) == cents
+
+# ================================================================================================
+# WARENKORB-SUMMEN
+# ================================================================================================
+@given(positions)
+def test_line_cents_sum_to_netto(rows):
+    cart = build_cart(rows)
+    totals = get_cart_totals(cart)
+
+    for item in cart:
+        reifen, service, position = totals.positionen[item.key]
+        assert reifen == reference_netto(item.preis_cent) * item.menge
+        assert service == sum(reference_netto(package['preis_cent']) for package in item.services)
+        assert position == reifen + service
+
+    assert sum(position for _, _, position in totals.positionen.values()) == totals.netto
+    assert totals.reifen + totals.services == totals.netto
+
+@given(positions)
+def test_brutto_is_netto_plus_mwst(rows):
+    totals = get_cart_totals(build_cart(rows))
+    assert totals.mwst == mwst_cents(totals.netto)
+    assert totals.brutto == totals.netto + totals.mwst
+
+# ================================================================================================
+# PDF UND WARENKORB ZEIGEN DIESELBEN BETRÄGE
+# ================================================================================================
+_STREAM = re.compile(rb"stream\r?\n(.*?)endstream", re.S)
+_TEXT = re.compile(rb"\(((?:[^()\\]|\\.)*)\) Tj")
+_ESCAPE = re.compile(rb"\\([0-7]{1,3}|.)", re.S)
+_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+
+def _unescape(text):
+    """PDF-Stringliteral zu Text - Klammern, Backslash und Oktal-Escapes wie \\374 (ü)"""
+    def replace(match):
+        code = match.group(1)
+        if code[:1].isdigit():
+            return bytes([int(code, 8)])
+        return _ESCAPES.get(code, code)
+    return _ESCAPE.sub(replace, text).decode("latin-1")
+
+def pdf_strings(pdf):
+    """Alle Textstücke der Seiten in Zeichenreihenfolge (ASCII85 + Flate wie von reportlab geschrieben)"""
+    strings = []
+    for raw in _STREAM.findall(pdf):
+        try:
+            data = zlib.decompress(base64.a85decode(raw.strip(), adobe=True))
+        except (ValueError, zlib.error):
+            continue
+        strings.extend(_unescape(text) for text in _TEXT.findall(data))
+    return strings
+
+@settings(max_examples=25, deadline=None)
+@given(positions)
+def test_pdf_shows_cart_totals(rows):
+    cart = build_cart(rows)
+    totals = get_cart_totals(cart)
+    strings = pdf_strings(create_professional_pdf({}, "winter", cart, {}, {}))
+
+    assert f"Gesamtbetrag (netto): {format_cents_german(totals.netto)}" in strings
+
+    # Summenzeile der MwSt-Tabelle: Arbeit, Material, Steuerbasis, MwSt, Altwerte, Gesamtbetrag
+    summe = strings[strings.index("Summe") + 1:][:6]
+    assert summe == [
+        format_cents_german(totals.services), format_cents_german(totals.reifen),
+        format_cents_german(totals.netto), format_cents_german(totals.mwst),
+        "0,00", format_cents_german(totals.brutto),
+    ]
+
+    # Letzte Spalte der Positionstabelle: Reifenzeilen und je Paket eine Zeile
+    zeilen = [format_cents_german(totals.positionen[item.key][0]) for item in cart]
+    zeilen += [format_cents_german(netto_cents(package['preis_cent'])) for item in cart for package in item.services]
+    for zeile in zeilen:
+        assert zeile in strings
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.cart import CartItem
+from utils.service_rules import ServiceRules, parse_range_rule, unsupported_rules, UNBEGRENZT
+
+ZOLL = list(range(12, 25))
+
+def baseline_zoll_match(rule, tire_zoll):
+    """Zoll-Prüfung der früheren Zeilen-Schleife (filter_service_packages_by_tire_size)"""
+    if rule is None or pd.isna(rule) or rule == '':
+        return True
+    rule = str(rule).strip()
+    if rule == '-17':
+        return tire_zoll <= 17
+    if rule == '18-19':
+        return 18 <= tire_zoll <= 19
+    if rule == '20-':
+        return tire_zoll >= 20
+    # Unbekannte Zoll-Angabe - vorsichtshalber anzeigen
+    return True
+
+def eligibility(tires, **columns):
+    """Paket x Reifen-Matrix für Pakete, deren Regel-Spalten als Listen übergeben werden"""
+    n_packages = len(next(iter(columns.values())))
+    df = pd.DataFrame({'Positionsnummer': [f"Z{i}" for i in range(n_packages)], **columns})
+    return ServiceRules(df).eligibility(tires)
+
+# ================================================================================================
+# ZOLL-BEREICHE - GLEICHES ERGEBNIS WIE DIE FRÜHERE ZEILEN-SCHLEIFE
+# ================================================================================================
+BASELINE_RULES = [None, '', '-17', '18-19', '20-', ' -17 ', 'abc', '16-x', '<<17']
+
+@pytest.mark.parametrize("tires", [
+    pd.DataFrame({'Zoll': np.array(ZOLL, dtype=np.int8)}),
+    [{'Zoll': zoll} for zoll in ZOLL],
+    [CartItem(i, "T", "", "", "", 0, zoll, None, "", "", "Winter") for i, zoll in enumerate(ZOLL)],
+], ids=["katalog", "dicts", "warenkorb"])
+def test_zoll_rules_match_baseline(tires):
+    result = eligibility(tires, Zoll=BASELINE_RULES)
+    expected = np.array([[baseline_zoll_match(rule, zoll) for zoll in ZOLL] for rule in BASELINE_RULES])
+    assert (result == expected).all()
+
+@pytest.mark.parametrize("rule, passend", [
+    ("<=15", [12, 13, 14, 15]),
+    ("<15", [12, 13, 14]),
+    (">=22", [22, 23, 24]),
+    (">22", [23, 24]),
+    ("=16", [16]),
+    ("16", [16]),
+    (16.0, [16]),
+    ("16-17", [16, 17]),
+    ("15, 18-19", [15, 18, 19]),
+    ("-13; 24-", [12, 13, 24]),
+])
+def test_range_grammar(rule, passend):
+    result = eligibility([{'Zoll': zoll} for zoll in ZOLL], Zoll=[rule])
+    assert [zoll for zoll, ok in zip(ZOLL, result[0]) if ok] == passend
+
+@pytest.mark.parametrize("rule", [None, "", "abc", "16-x", "<<17", "18-19 Zoll"])
+def test_unreadable_range_is_unbounded(rule):
+    assert parse_range_rule(rule) == UNBEGRENZT
+
+def test_tire_without_zoll():
+    # Ohne Zoll-Angabe passen nur Pakete ohne Einschränkung
+    result = eligibility([{'Zoll': None}], Zoll=['', '-17'])
+    assert result[:, 0].tolist() == [True, False]
+
+# ================================================================================================
+# WERTELISTEN (SAISON)
+# ================================================================================================
+SAISONS = ["Winter", "Sommer", "Ganzjahres", None]
+
+@pytest.mark.parametrize("rule, passend", [
+    (None, [True, True, True, True]),
+    ("", [True, True, True, True]),
+    ("Winter", [True, False, False, False]),
+    ("winter, Ganzjahres", [True, False, True, False]),
+    (" ; ", [True, True, True, True]),
+])
+def test_value_rules(rule, passend):
+    result = eligibility([{'Saison': saison} for saison in SAISONS], Saison=[rule])
+    assert result[0].tolist() == passend
+
+def test_zoll_and_saison_combine():
+    tires = [{'Zoll': 16, 'Saison': 'Winter'}, {'Zoll': 19, 'Saison': 'Winter'}, {'Zoll': 16, 'Saison': 'Sommer'}]
+    result = eligibility(tires, Zoll=['-17'], Saison=['Winter'])
+    assert result[0].tolist() == [True, False, False]
+
+# ================================================================================================
+# RF-REGELN WERDEN NICHT ANGEWENDET UND GEMELDET
+# ================================================================================================
+def test_rf_rules_are_ignored_and_reported():
+    df = pd.DataFrame({'Positionsnummer': ['Z1', 'Z2'], 'Zoll': ['', ''], 'RF': ['RF', None]})
+    rules = ServiceRules(df)
+    assert 'RF' not in rules.columns
+    assert rules.eligibility([{'Zoll': 16}]).all()
+    assert unsupported_rules(df) == {'RF': ['Z1']}
+    assert unsupported_rules(df.assign(RF=['', None])) == {}
@@ -0,0 +1,60 @@
+import pytest
+from hypothesis import given, strategies as st
+
+from utils.size_query import SizeQuery, parse_size_query, format_size_query
+
+# ================================================================================================
+# EINGABEN WIE AUF DER REIFENFLANKE
+# ================================================================================================
+@pytest.mark.parametrize("text, expected", [
+    # Vollständige Größe mit und ohne Trenner
+    ("205/55 R16 91H", SizeQuery(205, 55, 16, "91", "H")),
+    ("205/55R16", SizeQuery(205, 55, 16, None, None)),
+    ("205 55 16", SizeQuery(205, 55, 16, None, None)),
+    ("205-55-16", SizeQuery(205, 55, 16, None, None)),
+    ("2055516", SizeQuery(205, 55, 16, None, None)),
+    ("225/40 ZR18", SizeQuery(225, 40, 18, None, None)),
+    ("  205/55   r16  91h ", SizeQuery(205, 55, 16, "91", "H")),
+    # Teilgrößen
+    ("205", SizeQuery(205, None, None, None, None)),
+    ("205/55", SizeQuery(205, 55, None, None, None)),
+    ("R16", SizeQuery(None, None, 16, None, None)),
+    ("16 Zoll", SizeQuery(None, None, 16, None, None)),
+    ('16"', SizeQuery(None, None, 16, None, None)),
+    # Last- und Geschwindigkeitsindex
+    ("205/55 R16 91", SizeQuery(205, 55, 16, "91", None)),
+    ("205/55 R16 91 H", SizeQuery(205, 55, 16, "91", "H")),
+    ("195/65 R15 T", SizeQuery(195, 65, 15, None, "T")),
+    ("215/65 R16 109/107T", SizeQuery(215, 65, 16, "109/107", "T")),
+    ("2055516 91H", SizeQuery(205, 55, 16, "91", "H")),
+    # Zusätze am Ende
+    ("205/55 R16 94V XL", SizeQuery(205, 55, 16, "94", "V")),
+    ("205/55 R16 XL", SizeQuery(205, 55, 16, None, None)),
+    ("225/45 R17 91W RFT", SizeQuery(225, 45, 17, "91", "W")),
+])
+def test_parses_sidewall_notation(text, expected):
+    assert parse_size_query(text) == expected
+
+@pytest.mark.parametrize("text", [
+    "", "   ", None,
+    "Continental", "abc", "20", "2055", "205/5 R16",
+    # Buchstabe allein nur nach vollständiger Größe
+    "205 R", "205/55 T",
+    "205/55 R16 HH", "205/55 R16 91HH", "205/55 R16 1234",
+])
+def test_rejects_other_input(text):
+    assert parse_size_query(text) is None
+
+# ================================================================================================
+# ANZEIGE UND ERNEUTES EINLESEN
+# ================================================================================================
+size_queries = st.builds(
+    SizeQuery,
+    st.integers(125, 355), st.integers(25, 85), st.integers(12, 24),
+    st.one_of(st.none(), st.integers(60, 125).map(str)),
+    st.one_of(st.none(), st.sampled_from("HTVWY")),
+)
+
+@given(size_queries)
+def test_formatted_size_parses_back(query):
+    assert parse_size_query(format_size_query(query)) == query
@@ -0,0 +1,151 @@
+import hashlib
+
+import pandas as pd
+
+# ================================================================================================
+# WARENKORB-MODELL - EINE POSITION JE REIFEN, MENGE UND SERVICE-PAKETE AM EINTRAG
+# ================================================================================================
+STANDARD_MENGE = 4
+
+def cart_key(teilenummer, preis_cent):
+    """Stabiler Ganzzahl-Schlüssel eines Katalog-Artikels aus Teilenummer und Preis in Cent.
+
+    Gleicher Reifen zum gleichen Preis ergibt über Sessions und Katalog-Versionen
+    hinweg denselben Schlüssel - passt als int64 in numpy-Arrays.
+    """
+    digest = hashlib.blake2b(f"{teilenummer}|{preis_cent}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+def _value(value, default):
+    """Katalogwert als einfacher Python-Wert - fehlende Angaben werden zu default"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return default
+    return value.item() if hasattr(value, "item") else value
+
+class CartItem:
+    """Eine Warenkorb-Position: Momentaufnahme der Katalogzeile plus Menge und Service-Pakete.
+
+    services ist die Liste der gewählten Pakete (Dicts mit positionsnummer,
+    bezeichnung, preis_cent, hinweis).
+    """
+
+    __slots__ = (
+        "key", "teilenummer", "reifengroesse", "fabrikat", "profil", "preis_cent", "zoll",
+        "bestand", "kraftstoffeffizienz", "nasshaftung", "saison", "menge", "services",
+    )
+
+    # Katalog-Spaltenname -> Attribut, für Regeln und Auswertungen über Katalog und Warenkorb
+    COLUMNS = {
+        "Teilenummer": "teilenummer",
+        "Reifengröße": "reifengroesse",
+        "Fabrikat": "fabrikat",
+        "Profil": "profil",
+        "Preis_Cent": "preis_cent",
+        "Zoll": "zoll",
+        "Bestand": "bestand",
+        "Kraftstoffeffizienz": "kraftstoffeffizienz",
+        "Nasshaftung": "nasshaftung",
+        "Saison": "saison",
+    }
+
+    def __init__(self, key, teilenummer, reifengroesse, fabrikat, profil, preis_cent, zoll,
+                 bestand, kraftstoffeffizienz, nasshaftung, saison, menge=STANDARD_MENGE, services=None):
+        self.key = key
+        self.teilenummer = teilenummer
+        self.reifengroesse = reifengroesse
+        self.fabrikat = fabrikat
+        self.profil = profil
+        self.preis_cent = preis_cent
+        self.zoll = zoll
+        self.bestand = bestand
+        self.kraftstoffeffizienz = kraftstoffeffizienz
+        self.nasshaftung = nasshaftung
+        self.saison = saison
+        self.menge = menge
+        self.services = services if services is not None else []
+
+    @classmethod
+    def from_row(cls, row, key, preis_cent, menge=STANDARD_MENGE, services=None):
+        """Position aus einer Katalogzeile (pandas Series)"""
+        return cls(
+            key=key,
+            teilenummer=_value(row['Teilenummer'], ''),
+            reifengroesse=f"{row['Breite']}/{row['Hoehe']} R{row['Zoll']}",
+            fabrikat=_value(row['Fabrikat'], ''),
+            profil=_value(row['Profil'], ''),
+            preis_cent=preis_cent,
+            zoll=_value(row['Zoll'], None),
+            bestand=_value(row.get('Bestand'), None),
+            kraftstoffeffizienz=_value(row.get('Kraftstoffeffizienz'), ''),
+            nasshaftung=_value(row.get('Nasshaftung'), ''),
+            saison=_value(row.get('Saison'), 'Unbekannt'),
+            menge=menge,
+            services=services,
+        )
+
+    def get(self, column, default=None):
+        """Wert per Katalog-Spaltenname wie bei einem Dict - z.B. für die Service-Regeln"""
+        attribute = self.COLUMNS.get(column)
+        return getattr(self, attribute) if attribute is not None else default
+
+    def to_dict(self):
+        """Alle Felder als JSON-fähiges Dict - Gegenstück zu from_dict()"""
+        return {attribute: getattr(self, attribute) for attribute in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Position aus einem gespeicherten Dict - unbekannte Felder werden ignoriert"""
+        return cls(**{attribute: data[attribute] for attribute in cls.__slots__ if attribute in data})
+
+class Cart:
+    """Warenkorb einer Session - Positionen in Einfüge-Reihenfolge, Zugriff per Schlüssel"""
+
+    __slots__ = ("_items",)
+
+    def __init__(self):
+        self._items = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        return self._items.get(key)
+
+    def keys(self):
+        return self._items.keys()
+
+    def add(self, item):
+        """Fügt eine Position hinzu - False wenn der Reifen schon im Warenkorb liegt"""
+        if item.key in self._items:
+            return False
+        self._items[item.key] = item
+        return True
+
+    def remove(self, key):
+        """Entfernt eine Position und gibt sie zurück - None wenn nicht vorhanden"""
+        return self._items.pop(key, None)
+
+    def clear(self):
+        self._items.clear()
+
+    def has_services(self):
+        """Ob für mindestens eine Position Service-Pakete gewählt sind"""
+        return any(item.services for item in self._items.values())
+
+    def to_list(self):
+        """Positionen als Liste von Dicts in Warenkorb-Reihenfolge"""
+        return [item.to_dict() for item in self._items.values()]
+
+    @classmethod
+    def from_list(cls, items):
+        """Warenkorb aus einer mit to_list() gespeicherten Liste"""
+        cart = cls()
+        for data in items:
+            cart.add(CartItem.from_dict(data))
+        return cart
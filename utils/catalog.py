@@ -0,0 +1,527 @@
+import streamlit as st
+import pandas as pd
+import hashlib
+import logging
+from pathlib import Path
+
+import numpy as np
+
+from utils.tire_index import SizeIndex, FilterEngine, SearchIndex, build_price_range
+from utils.money import to_cents
+from utils.cart import cart_key
+from utils.service_rules import ServiceRules, unsupported_rules
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # Ohne pyarrow wird immer die CSV gelesen
+    pa = None
+    feather = None
+
+logger = logging.getLogger(__name__)
+
+# ================================================================================================
+# BASISKONFIGURATION
+# ================================================================================================
+BASE_DIR = Path("data")
+MASTER_CSV = BASE_DIR / "Ramsperger_Winterreifen_20250826_160010.csv"
+MASTER_SNAPSHOT = MASTER_CSV.with_suffix(".feather")
+# Metadaten-Schlüssel im Snapshot: Version (mtime_ns:Größe) der Quelldatei, aus der er gebaut wurde
+SNAPSHOT_SOURCE_KEY = b"ramsperger.source_version"
+SERVICES_CONFIG_CSV = BASE_DIR / "ramsperger_services_config.csv"
+SERVICE_COLUMNS = ['Positionsnummer', 'Bezeichnung', 'Teilenummer_Detail', 'Preis', 'Hinweis', 'Zoll']
+EXCEL_VORLAGEN = BASE_DIR / "2025-07-29_ReifenPremium_Winterreifen_2025-26.xlsx"
+EXCEL_VORLAGEN_PATTERN = "*ReifenPremium*.xlsx"
+CACHE_DIR = BASE_DIR / ".cache"
+# Bei Änderungen an der Vorlagen-Normalisierung erhöhen - alte Caches werden dann neu gebaut
+VORLAGEN_CACHE_VERSION = 3
+
+# ================================================================================================
+# KATALOG-SCHEMA - KOMPAKTE SPALTENTYPEN
+# ================================================================================================
+# Text mit wenigen Ausprägungen als Kategorie, Maße als kleine Ganzzahlen, Preis als float32.
+# Loadindex bleibt Kategorie, da es Doppelangaben wie "99/98" gibt.
+CATALOG_SCHEMA = {
+    "Breite": "int16",
+    "Hoehe": "int16",
+    "Zoll": "int8",
+    "Preis_EUR": "float32",
+    "Bestand": "Int32",
+    "Fabrikat": "category",
+    "Profil": "category",
+    "Speedindex": "category",
+    "Loadindex": "category",
+    "Saison": "category",
+    "Kraftstoffeffizienz": "category",
+    "Nasshaftung": "category",
+    "Dimension": "category",
+    "RF": "category",
+    "Kennzeichen": "category",
+}
+# float32 ist auf ~7 Stellen genau - Preise beim Verlassen des Katalogs entsprechend runden
+PRICE_DECIMALS = 4
+
+def apply_catalog_schema(df):
+    """Wandelt vorhandene Spalten in das kompakte Katalog-Schema um"""
+    for col, dtype in CATALOG_SCHEMA.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if dtype == "category":
+            df[col] = df[col].astype("category")
+            continue
+        values = pd.to_numeric(df[col], errors="coerce")
+        if dtype.startswith("int") and values.isna().any():
+            dtype = dtype.capitalize()  # Nullable Variante, z.B. Int16
+        elif dtype == "Int32":
+            values = values.round()
+        df[col] = values.astype(dtype)
+    return df
+
+def editable_copy(df):
+    """Kopie mit einfachen Spaltentypen für .loc-Zuweisungen und Exporte.
+
+    Ganzzahlen mit Lücken (Bestand) bleiben als Int64 ganzzahlig - als float64
+    stünde beim Speichern 25.0 statt 25 in der CSV.
+    """
+    df = df.copy()
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+        elif dtype == "float32":
+            df[col] = df[col].astype("float64").round(PRICE_DECIMALS)
+        elif isinstance(dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(dtype):
+            df[col] = df[col].astype("Int64")
+        elif pd.api.types.is_integer_dtype(dtype):
+            df[col] = df[col].astype("int64")
+    return df
+
+def price_to_float(value):
+    """Preis aus dem Katalog als Python-float ohne float32-Rundungsartefakte"""
+    return round(float(value), PRICE_DECIMALS)
+
+# ================================================================================================
+# HELPER FUNCTIONS
+# ================================================================================================
+# Saison-Kennung aus dem Teilenummern-Präfix
+SAISON_PREFIXES = {"ZTW": "Winter", "ZTR": "Ganzjahres", "ZTS": "Sommer"}
+
+def get_saison_from_teilenummer(teilenummer):
+    """Ermittelt Saison basierend auf Teilenummer (Einzelwert)"""
+    if pd.isna(teilenummer) or teilenummer == '':
+        return "Unbekannt"
+    return SAISON_PREFIXES.get(str(teilenummer).strip().upper()[:3], "Unbekannt")
+
+def derive_saison(teilenummern):
+    """Ermittelt die Saison für eine ganze Teilenummern-Spalte auf einmal"""
+    prefixes = teilenummern.astype("string").str.strip().str.upper().str[:3]
+    return prefixes.map(SAISON_PREFIXES).fillna("Unbekannt").astype(object)
+
+def clean_dataframe(df):
+    """Bereinigt und normalisiert DataFrame"""
+    if df.empty:
+        return df
+    if "Preis_EUR" in df.columns:
+        if df["Preis_EUR"].dtype == object:
+            df["Preis_EUR"] = (
+                df["Preis_EUR"]
+                .astype(str)
+                .str.replace(",", ".", regex=False)
+                .str.replace("€", "", regex=False)
+                .str.strip()
+            )
+        df["Preis_EUR"] = pd.to_numeric(df["Preis_EUR"], errors="coerce")
+    elif "Preis Leasing netto" in df.columns:
+        df["Preis_EUR"] = pd.to_numeric(df["Preis Leasing netto"], errors="coerce")
+    for c in ["Breite", "Hoehe", "Zoll"]:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype("Int64")
+    if "Bestand" in df.columns:
+        df["Bestand"] = pd.to_numeric(df["Bestand"], errors="coerce")
+    required_cols = ["Fabrikat", "Profil", "Kraftstoffeffizienz", "Nasshaftung",
+                     "Loadindex", "Speedindex", "Teilenummer", "Geräuschklasse"]
+    for col in required_cols:
+        if col not in df.columns:
+            df[col] = pd.NA
+    if "Saison" not in df.columns:
+        df["Saison"] = derive_saison(df["Teilenummer"])
+    df = df.dropna(subset=["Preis_EUR", "Breite", "Hoehe", "Zoll"], how="any")
+    return apply_catalog_schema(df)
+
+def create_fallback_data():
+    """Fallback Beispiel-Daten falls CSV nicht geladen werden kann"""
+    sample_data = {
+        'Breite': [195, 205, 215, 225, 195, 205, 215, 225],
+        'Hoehe': [65, 55, 60, 55, 60, 60, 55, 50],
+        'Zoll': [15, 16, 16, 17, 16, 17, 17, 18],
+        'Fabrikat': ['Continental', 'Michelin', 'Bridgestone', 'Pirelli', 'Continental', 'Michelin', 'Bridgestone', 'Pirelli'],
+        'Profil': ['WinterContact TS850', 'Alpin 6', 'Blizzak LM005', 'Winter Sottozero 3', 'WinterContact TS860', 'Alpin 5', 'Blizzak WS90', 'Winter Sottozero Serie II'],
+        'Teilenummer': ['ZTW15494940000', 'ZTW03528700000', 'ZTW19394', 'ZTW8019227308853', 'ZTS15495040000', 'ZTS03528800000', 'ZTR19395', 'ZTR8019227308854'],
+        'Preis_EUR': [89.90, 95.50, 87.20, 99.90, 92.90, 98.50, 89.20, 103.90],
+        'Loadindex': [91, 91, 94, 94, 88, 91, 94, 97],
+        'Speedindex': ['T', 'H', 'H', 'V', 'H', 'H', 'H', 'V'],
+        'Kraftstoffeffizienz': ['C', 'B', 'A', 'C', 'C', 'B', 'A', 'C'],
+        'Nasshaftung': ['B', 'A', 'A', 'B', 'B', 'A', 'A', 'B'],
+        'Bestand': [25, 12, 8, 15, 30, 0, -5, 20],
+        'Geräuschklasse': [68, 69, 67, 70, 68, 69, 67, 71]
+    }
+    df = pd.DataFrame(sample_data)
+    df["Saison"] = derive_saison(df["Teilenummer"])
+    return apply_catalog_schema(df)
+
+# ================================================================================================
+# BINÄR-SNAPSHOT (FEATHER) NEBEN DER CSV
+# ================================================================================================
+def get_file_version(path):
+    """Liefert (mtime, Größe) einer Datei als Versionsschlüssel - None falls nicht vorhanden"""
+    try:
+        stat = Path(path).stat()
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+def get_file_hash(path):
+    """SHA-256 einer Datei (blockweise gelesen)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _format_version(version):
+    return f"{version[0]}:{version[1]}".encode("ascii")
+
+def write_snapshot(df, snapshot_path, source_version=None):
+    """Schreibt einen typisierten Feather-Snapshot (unkomprimiert, damit er gemappt werden kann).
+
+    source_version ist die Version der Quelldatei beim Einlesen - sie wird in den
+    Metadaten abgelegt und beim Lesen exakt verglichen.
+    """
+    if feather is None:
+        return False
+    tmp_path = snapshot_path.with_name(snapshot_path.name + ".tmp")
+    try:
+        table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+        if source_version is not None:
+            metadata = dict(table.schema.metadata or {})
+            metadata[SNAPSHOT_SOURCE_KEY] = _format_version(source_version)
+            table = table.replace_schema_metadata(metadata)
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        tmp_path.replace(snapshot_path)
+        return True
+    except Exception as e:
+        logger.warning("Snapshot %s konnte nicht geschrieben werden: %s", snapshot_path, e)
+        tmp_path.unlink(missing_ok=True)
+        return False
+
+def read_snapshot(snapshot_path, source_path):
+    """Liest den Snapshot per Memory-Map - nur wenn er aus genau der aktuellen Quelldatei gebaut wurde.
+
+    Verglichen wird die gespeicherte (mtime_ns, Größe) der Quelle, nicht das Alter
+    des Snapshots - ein kopierter oder zurückgespielter Stand wird so nicht übersehen.
+    """
+    if feather is None or not Path(snapshot_path).exists():
+        return None
+    source_version = get_file_version(source_path)
+    if source_version is None:
+        return None
+    table = _read_feather_table(snapshot_path)
+    if table is None:
+        return None
+    if (table.schema.metadata or {}).get(SNAPSHOT_SOURCE_KEY) != _format_version(source_version):
+        return None
+    return table.to_pandas()
+
+def _read_feather_table(path):
+    """Liest eine Feather-Datei per Memory-Map als Arrow-Tabelle - None bei Fehlern"""
+    try:
+        return feather.read_table(path, memory_map=True)
+    except Exception as e:
+        logger.warning("Feather-Datei %s nicht lesbar: %s", path, e)
+        return None
+
+def _read_feather(path):
+    """Liest eine Feather-Datei per Memory-Map - None bei Fehlern"""
+    table = _read_feather_table(path)
+    return table.to_pandas() if table is not None else None
+
+def write_master_snapshot(df):
+    """Baut den Snapshot der Master-CSV aus einem (ggf. unbereinigten) DataFrame - nach dem Schreiben der CSV"""
+    return write_snapshot(clean_dataframe(df.copy()), MASTER_SNAPSHOT, get_file_version(MASTER_CSV))
+
+def read_master_snapshot():
+    """Bereinigte Master-Daten aus dem Snapshot - None falls veraltet oder nicht vorhanden"""
+    return read_snapshot(MASTER_SNAPSHOT, MASTER_CSV)
+
+# ================================================================================================
+# DATA MANAGEMENT - PROZESSWEITER KATALOG
+# ================================================================================================
+def read_master_data():
+    """Lädt die bereinigte Master-CSV - bevorzugt aus dem Snapshot, leer falls keine CSV existiert"""
+    if not MASTER_CSV.exists():
+        return pd.DataFrame()
+    df = read_master_snapshot()
+    if df is None:
+        # Version vor dem Lesen - ändert sich die CSV währenddessen, passt der Snapshot nie
+        source_version = get_file_version(MASTER_CSV)
+        df = clean_dataframe(pd.read_csv(MASTER_CSV, encoding='utf-8'))
+        write_snapshot(df, MASTER_SNAPSHOT, source_version)
+    return apply_catalog_schema(df)
+
+class TireCatalog:
+    """Schreibgeschützter Reifenkatalog, der von allen Sessions gemeinsam genutzt wird.
+
+    Der DataFrame darf nicht verändert werden - Filter und Sortierungen
+    arbeiten immer auf Kopien bzw. Teilmengen, Schreibzugriffe über
+    load_master_data() und save_master_data().
+    """
+
+    def __init__(self, df, version, is_fallback=False, load_error=None):
+        self.df = df
+        self.version = version
+        self.is_fallback = is_fallback
+        self.load_error = load_error
+        self.size_index = SizeIndex(df)
+        self.filter_engine = FilterEngine(df, self.size_index)
+        self.facet_options = self.filter_engine.facet_options
+        self.price_range = build_price_range(df)
+        self.search_index = SearchIndex(df)
+        # Warenkorb-Schlüssel je Zeile (Teilenummer + Preis in Cent) - einmal pro Version
+        self.preis_cent = np.fromiter(
+            (to_cents(price_to_float(preis)) for preis in df['Preis_EUR']), dtype=np.int64, count=len(df)
+        )
+        self.cart_keys = np.fromiter(
+            (cart_key(teilenummer, cent) for teilenummer, cent in zip(df['Teilenummer'], self.preis_cent)),
+            dtype=np.int64, count=len(df)
+        )
+        self._teilenummern = None
+
+    def __len__(self):
+        return len(self.df)
+
+    def cart_keys_for(self, subset):
+        """Warenkorb-Schlüssel der Zeilen eines Teilergebnisses (Index wie im Katalog)"""
+        return self.cart_keys[self.df.index.get_indexer(subset.index)]
+
+    def preis_cent_for(self, subset):
+        """Preise in Cent der Zeilen eines Teilergebnisses (Index wie im Katalog)"""
+        return self.preis_cent[self.df.index.get_indexer(subset.index)]
+
+    def has_teilenummer(self, teilenummer):
+        """Prüft ob eine Teilenummer im Katalog vorhanden ist"""
+        if self.is_fallback or 'Teilenummer' not in self.df.columns:
+            return False
+        if self._teilenummern is None:
+            self._teilenummern = frozenset(self.df['Teilenummer'].dropna().tolist())
+        return teilenummer in self._teilenummern
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _build_catalog(version):
+    """Baut den Katalog genau einmal pro Version der Master-CSV"""
+    try:
+        if MASTER_CSV.exists():
+            return TireCatalog(read_master_data(), version)
+        return TireCatalog(create_fallback_data(), version, is_fallback=True)
+    except Exception as e:
+        return TireCatalog(create_fallback_data(), version, is_fallback=True, load_error=str(e))
+
+def get_catalog():
+    """Gibt den prozessweiten Katalog für den aktuellen Stand der Master-CSV zurück"""
+    return _build_catalog(get_file_version(MASTER_CSV))
+
+def get_master_df():
+    """Master-Daten für die Verwaltung (nur lesen) - leer falls keine Master-CSV existiert"""
+    catalog = get_catalog()
+    if catalog.load_error:
+        raise RuntimeError(catalog.load_error)
+    if catalog.is_fallback:
+        return pd.DataFrame()
+    return catalog.df
+
+def load_master_data():
+    """Editierbare Kopie der Master-Daten für Änderungen in der Verwaltung"""
+    return editable_copy(get_master_df())
+
+def save_master_data(df):
+    """Schreibt die Master-CSV samt Snapshot - die neue Dateiversion löst genau einen Katalog-Neuaufbau aus"""
+    MASTER_CSV.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(MASTER_CSV, index=False, encoding='utf-8')
+    write_master_snapshot(df)
+
+# ================================================================================================
+# SERVICE-PAKETE
+# ================================================================================================
+def _empty_service_packages():
+    return pd.DataFrame(columns=SERVICE_COLUMNS)
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _read_service_packages(version):
+    """Liest die Service-Konfiguration einmal pro Dateiversion"""
+    if version is None:
+        return _empty_service_packages()
+    return pd.read_csv(SERVICES_CONFIG_CSV, encoding='utf-8')
+
+def load_service_packages():
+    """Lädt die Service-Pakete aus der CSV"""
+    try:
+        return _read_service_packages(get_file_version(SERVICES_CONFIG_CSV))
+    except Exception as e:
+        st.error(f"Fehler beim Laden der Service-Pakete: {e}")
+        return _empty_service_packages()
+
+class ServicePackages:
+    """Service-Pakete mit einmal kompilierten Regeln (Zoll-Bereiche, optional Saison).
+
+    Hängen die Regeln nur vom Zoll ab, werden die passenden Pakete je
+    Felgengröße vorberechnet. by_positionsnummer löst Pakete per
+    Dict-Zugriff auf. Suche, Warenkorb und PDF teilen sich eine Instanz pro
+    Version der Service-Konfiguration.
+    """
+
+    ZOLL_SIZES = range(10, 31)
+
+    def __init__(self, df):
+        self.df = df
+        self.records = df.to_dict('records')
+        for record in self.records:
+            # Pauschalpreis einmal in ganze Cent - Warenkorb und PDF rechnen nur damit
+            record['Preis_Cent'] = to_cents(record.get('Preis'))
+        self.by_positionsnummer = {}
+        for record in self.records:
+            # Bei doppelten Positionsnummern gilt wie bisher der erste Eintrag
+            self.by_positionsnummer.setdefault(record['Positionsnummer'], record)
+        self.rules = ServiceRules(df)
+        self.by_zoll = None
+        if set(self.rules.columns) <= {"Zoll"}:
+            sizes = [{"Zoll": zoll} for zoll in self.ZOLL_SIZES]
+            self.by_zoll = dict(zip(self.ZOLL_SIZES, self.for_tires(sizes)))
+
+    def for_tires(self, tires):
+        """Passende Pakete je Reifen in einem Durchlauf - Liste von Paket-Listen (Dicts der Service-CSV)"""
+        eligible = self.rules.eligibility(tires)
+        return [[self.records[i] for i in np.flatnonzero(column)] for column in eligible.T]
+
+    def for_tire(self, tire):
+        """Passende Pakete für einen Reifen (Katalogzeile oder Warenkorb-Eintrag)"""
+        if self.by_zoll is not None:
+            packages = self.by_zoll.get(tire.get('Zoll'))
+            if packages is not None:
+                return packages
+        return self.for_tires([tire])[0]
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _build_service_packages(version):
+    """Baut die Paket-Tabelle genau einmal pro Version der Service-Konfiguration"""
+    return ServicePackages(_read_service_packages(version))
+
+def get_service_packages():
+    """Geteilte Paket-Tabelle - nur lesen!"""
+    try:
+        return _build_service_packages(get_file_version(SERVICES_CONFIG_CSV))
+    except Exception as e:
+        st.error(f"Fehler beim Laden der Service-Pakete: {e}")
+        return ServicePackages(_empty_service_packages())
+
+def save_service_packages(packages_df):
+    """Speichert die Service-Pakete in die CSV - Regeln auf unbekannte Spalten (z.B. RF) werden abgelehnt"""
+    rejected = unsupported_rules(packages_df)
+    if rejected:
+        details = "; ".join(f"{column}: {', '.join(packages)}" for column, packages in rejected.items())
+        st.error(f"Service-Pakete nicht gespeichert - Regeln auf diese Spalten werden nicht unterstützt ({details})")
+        return False
+    try:
+        SERVICES_CONFIG_CSV.parent.mkdir(parents=True, exist_ok=True)
+        packages_df.to_csv(SERVICES_CONFIG_CSV, index=False, encoding='utf-8')
+        return True
+    except Exception as e:
+        st.error(f"Fehler beim Speichern der Service-Pakete: {e}")
+        return False
+
+# ================================================================================================
+# EXCEL-VORLAGEN (PREMIUM-DATEN) - MIT BINÄR-CACHE NACH DATEI-HASH
+# ================================================================================================
+def find_excel_vorlagen():
+    """Neueste Premium-Excel im data/ Ordner - neu abgelegte Dateien werden automatisch verwendet"""
+    candidates = [p for p in BASE_DIR.glob(EXCEL_VORLAGEN_PATTERN) if not p.name.startswith("~$")]
+    if not candidates:
+        return EXCEL_VORLAGEN
+    return max(candidates, key=lambda p: p.stat().st_mtime_ns)
+
+def read_excel_vorlagen(excel_path):
+    """Liest die Excel-Vorlagen und normalisiert sie (langsam - openpyxl)"""
+    df = pd.read_excel(excel_path, sheet_name=0)
+
+    # Spalten-Namen bereinigen
+    df.columns = df.columns.str.replace(r'\r\n', ' ', regex=True).str.strip()
+
+    # Dimension inkl. Runflat-Kennzeichnung spaltenweise zusammenbauen
+    has_rf = df['RF'].notna() & (df['RF'] != '')
+    df['Dimension'] = (
+        df['Breite'].astype(str) + '/' +
+        df['Hoehe'].astype(str) + ' ' +
+        df['R'].astype(str) + df['Zoll'].astype(str) + ' ' +
+        df['Loadindex'].astype(str) + df['Speedindex'].astype(str) +
+        has_rf.map({True: ' RF', False: ''})
+    )
+
+    # Preis-Spalte finden
+    preis_col = None
+    for col in df.columns:
+        if 'Preis' in col and 'netto' in col:
+            preis_col = col
+            break
+
+    if preis_col:
+        df['Preis_EUR'] = pd.to_numeric(df[preis_col], errors='coerce')
+    else:
+        df['Preis_EUR'] = 0.0
+
+    # Spalten umbenennen/erstellen
+    required_cols = ['Dimension', 'Fabrikat', 'Profil', 'Teilenummer', 'Preis_EUR',
+                    'Zoll', 'Breite', 'Hoehe', 'RF', 'Kennzeichen']
+    for col in required_cols:
+        if col not in df.columns:
+            df[col] = ''
+
+    # Nur relevante Spalten
+    df = df[['Dimension', 'Fabrikat', 'Profil', 'Teilenummer', 'Preis_EUR', 'Zoll',
+            'Breite', 'Hoehe', 'RF', 'Kennzeichen', 'Speedindex', 'Loadindex']]
+    df = df.fillna('')
+
+    # Loadindex enthält Zahlen und Doppelangaben wie "99/98" - einheitlich als Text
+    df['Loadindex'] = df['Loadindex'].astype(str)
+
+    # Saison basierend auf Teilenummer hinzufügen
+    df['Saison'] = derive_saison(df['Teilenummer'])
+
+    return apply_catalog_schema(df)
+
+def get_vorlagen_cache_path(file_hash):
+    """Pfad des Binär-Caches für eine bestimmte Excel-Version"""
+    return CACHE_DIR / f"vorlagen_v{VORLAGEN_CACHE_VERSION}_{file_hash[:16]}.feather"
+
+def load_excel_vorlagen_table(excel_path, file_hash=None):
+    """Normalisierte Vorlagen-Tabelle - aus dem Binär-Cache oder neu aus der Excel aufgebaut"""
+    if file_hash is None:
+        file_hash = get_file_hash(excel_path)
+    cache_path = get_vorlagen_cache_path(file_hash)
+
+    if feather is None:
+        logger.warning("pyarrow nicht installiert - %s wird ohne Binär-Cache neu eingelesen", excel_path)
+    elif cache_path.exists():
+        df = _read_feather(cache_path)
+        if df is not None:
+            return df
+        logger.warning("Vorlagen-Cache %s unbrauchbar - %s wird neu eingelesen", cache_path, excel_path)
+    else:
+        logger.info("Kein Vorlagen-Cache für diese Version - %s wird eingelesen", excel_path)
+
+    df = read_excel_vorlagen(excel_path)
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    if write_snapshot(df, cache_path):
+        # Caches älterer Excel-Versionen aufräumen
+        for old_cache in CACHE_DIR.glob("vorlagen_*.feather"):
+            if old_cache != cache_path:
+                old_cache.unlink(missing_ok=True)
+    return df
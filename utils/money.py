@@ -0,0 +1,40 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+import pandas as pd
+
+# ================================================================================================
+# GELDBETRÄGE IN GANZEN CENT - KAUFMÄNNISCH GERUNDET
+# ================================================================================================
+# Katalog- und Service-Preise sind Bruttopreise. Sie werden einmal beim Übernehmen in Warenkorb
+# bzw. Paket-Tabelle in Cent umgerechnet, danach wird nur noch mit Ganzzahlen gerechnet.
+MWST_PROZENT = 19
+
+def to_cents(value):
+    """Euro-Betrag (float, str, Decimal) als ganze Cent, kaufmännisch gerundet - fehlend = 0"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return 0
+    try:
+        euros = Decimal(str(value).replace(",", ".").replace("€", "").strip())
+    except InvalidOperation:
+        return 0
+    return int((euros * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def netto_cents(brutto_cents):
+    """Nettobetrag zu einem Bruttobetrag (19% MwSt herausgerechnet) - auch für numpy-Arrays"""
+    return (brutto_cents * 200 + (100 + MWST_PROZENT)) // (2 * (100 + MWST_PROZENT))
+
+def mwst_cents(netto_cents):
+    """MwSt auf einen Nettobetrag - auch für numpy-Arrays"""
+    return (netto_cents * 2 * MWST_PROZENT + 100) // 200
+
+def format_cents(cents):
+    """Cent-Betrag als '1234.56'"""
+    sign = "-" if cents < 0 else ""
+    euros, rest = divmod(abs(int(cents)), 100)
+    return f"{sign}{euros}.{rest:02d}"
+
+def format_cents_german(cents):
+    """Cent-Betrag im deutschen Format, z.B. '1.234,56'"""
+    sign = "-" if cents < 0 else ""
+    euros, rest = divmod(abs(int(cents)), 100)
+    return f"{sign}{euros:,}".replace(",", ".") + f",{rest:02d}"
@@ -1,10 +1,16 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
 import urllib.parse
 import io
 import re
+import json
+import hashlib
+import threading
+from collections import namedtuple, OrderedDict
+from functools import lru_cache
+
+import numpy as np
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -16,6 +22,9 @@ from reportlab.platypus import (
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 
+from utils.catalog import get_service_packages
+from utils.money import netto_cents, mwst_cents, format_cents, format_cents_german
+
 # ================================================================================================
 # FESTE FILIAL- UND MITARBEITERDATEN (ERSETZT EXCEL-ANBINDUNG) - UNVERÄNDERT
 # ================================================================================================
@@ -797,29 +806,10 @@ def build_phone_number(zentrale, durchwahl):
 # ================================================================================================
 # SERVICE-PAKETE LADEN UND VERARBEITEN - UNVERÄNDERT
 # ================================================================================================
-@st.cache_data
-def load_service_packages():
-    """Lädt die Service-Pakete aus der CSV"""
-    try:
-        csv_path = Path("data/ramsperger_services_config.csv")
-        if csv_path.exists():
-            df = pd.read_csv(csv_path, encoding='utf-8')
-            return df
-        else:
-            return pd.DataFrame(columns=['Positionsnummer', 'Bezeichnung', 'Teilenummer_Detail', 'Preis', 'Hinweis', 'Zoll'])
-    except Exception as e:
-        return pd.DataFrame(columns=['Positionsnummer', 'Bezeichnung', 'Teilenummer_Detail', 'Preis', 'Hinweis', 'Zoll'])
-
 def get_service_package_by_positionsnummer(positionsnummer):
     """Holt ein Service-Paket anhand der Positionsnummer"""
-    service_df = load_service_packages()
-    if service_df.empty:
-        return None
-    
-    package = service_df[service_df['Positionsnummer'] == positionsnummer]
-    if not package.empty:
-        return package.iloc[0].to_dict()
-    return None
+    package = get_service_packages().by_positionsnummer.get(positionsnummer)
+    return dict(package) if package is not None else None
 
 # ================================================================================================
 # PERSONALISIERTE ANREDE FUNKTIONEN - UNVERÄNDERT
@@ -846,15 +836,15 @@ def create_personalized_salutation(customer_data=None):
 # ================================================================================================
 # SAISON-ERKENNUNG - UNVERÄNDERT
 # ================================================================================================
-def detect_cart_season(cart_items):
+def detect_cart_season(cart):
     """Erkennt die dominante Saison im Warenkorb"""
-    if not cart_items:
+    if not cart:
         return "neutral"
     
     saison_counts = {"Winter": 0, "Sommer": 0, "Ganzjahres": 0, "Unbekannt": 0}
     
-    for item in cart_items:
-        saison = item.get('Saison', 'Unbekannt')
+    for item in cart:
+        saison = item.saison
         saison_counts[saison] = saison_counts.get(saison, 0) + 1
     
     total_items = sum(saison_counts.values())
@@ -904,17 +894,13 @@ def get_season_greeting_text(detected_season):
 # ================================================================================================
 # SERVICE DETECTION FÜR DYNAMISCHE ÜBERSCHRIFT - UNVERÄNDERT
 # ================================================================================================
-def has_services_in_cart(cart_items, cart_services):
+def has_services_in_cart(cart):
     """Prüft ob Services im Warenkorb aktiviert sind"""
-    for item in cart_items:
-        item_services = cart_services.get(item['id'], [])
-        if item_services:  # Wenn Service-Pakete ausgewählt sind
-            return True
-    return False
+    return cart.has_services()
 
-def get_dynamic_title(cart_items, cart_services):
+def get_dynamic_title(cart):
     """Generiert dynamische Überschrift basierend auf Warenkorb-Inhalt"""
-    if has_services_in_cart(cart_items, cart_services):
+    if has_services_in_cart(cart):
         return "Angebot Reifen & Service"
     else:
         return "Angebot Reifen"
@@ -922,50 +908,60 @@ def get_dynamic_title(cart_items, cart_services):
 # ================================================================================================
 # WARENKORB-BERECHNUNGEN - MIT NETTO-PREISEN (19% MWST ABZIEHEN)
 # ================================================================================================
-def calculate_position_total(item, quantity, selected_packages):
-    """Berechnet Gesamtkosten für eine Position - BRUTTOPREISE ZU NETTO KONVERTIEREN"""
-    # REIFEN: Bruttopreis zu Netto konvertieren (19% MwSt abziehen)
-    brutto_reifen_preis = item['Preis_EUR']
-    netto_reifen_preis = brutto_reifen_preis / 1.19  # 19% MwSt abziehen
-    reifen_kosten_netto = netto_reifen_preis * quantity
-    
-    service_kosten_netto = 0.0
-    
-    # SERVICE-PAKETE: Bruttopreise zu Netto konvertieren
-    for package in selected_packages:
-        brutto_pkg_price = float(package['preis'])
-        netto_pkg_price = brutto_pkg_price / 1.19  # 19% MwSt abziehen
-        # Alle Service-Pakete sind Pauschalpreise
-        service_kosten_netto += netto_pkg_price
-    
-    return reifen_kosten_netto, service_kosten_netto, reifen_kosten_netto + service_kosten_netto
+CartTotals = namedtuple("CartTotals", ["positionen", "reifen", "services", "netto", "mwst", "brutto"])
 
-def get_cart_total(cart_items, cart_quantities, cart_services):
-    """Berechnet Gesamtsumme des Warenkorbs - NETTO-PREISE"""
-    total = 0.0
-    breakdown = {'reifen': 0.0, 'services': 0.0}
-    
-    for item in cart_items:
-        quantity = cart_quantities.get(item['id'], 4)
-        selected_packages = cart_services.get(item['id'], [])
-        
-        reifen_kosten, service_kosten, position_total = calculate_position_total(item, quantity, selected_packages)
-        
-        total += position_total
-        breakdown['reifen'] += reifen_kosten
-        breakdown['services'] += service_kosten
-    
-    return total, breakdown
+def cart_content_key(cart):
+    """Inhalts-Schlüssel des Warenkorbs - alles was in die Preisberechnung eingeht (Cent)"""
+    return tuple([
+        (item.key, item.preis_cent, item.menge, tuple([package['preis_cent'] for package in item.services]))
+        for item in cart
+    ])
+
+@lru_cache(maxsize=64)
+def _compute_cart_totals(content):
+    """Alle Positions- und Service-Summen, Netto, MwSt und Brutto in einem Array-Durchlauf (Cent)"""
+    n = len(content)
+    preise = np.fromiter((position[1] for position in content), dtype=np.int64, count=n)
+    mengen = np.fromiter((position[2] for position in content), dtype=np.int64, count=n)
+    owner = np.fromiter(
+        (i for i, position in enumerate(content) for _ in position[3]), dtype=np.int64
+    )
+    paket_preise = np.fromiter(
+        (preis for position in content for preis in position[3]), dtype=np.int64, count=len(owner)
+    )
+
+    # Netto-Einzelpreis je Reifen wird gerundet, die Zeile ist Einzelpreis x Menge wie im PDF.
+    # Service-Pakete sind Pauschalpreise und werden je Paket gerundet.
+    reifen = netto_cents(preise) * mengen
+    services = np.zeros(n, dtype=np.int64)
+    np.add.at(services, owner, netto_cents(paket_preise))
+    positionen = reifen + services
+
+    # Summen sind exakt die Summe der Zeilen, die MwSt wird einmal auf die Netto-Summe gerechnet
+    netto = int(positionen.sum())
+    mwst = int(mwst_cents(netto))
+    return CartTotals(
+        positionen={
+            position[0]: (int(r), int(s), int(t))
+            for position, r, s, t in zip(content, reifen, services, positionen)
+        },
+        reifen=int(reifen.sum()),
+        services=int(services.sum()),
+        netto=netto,
+        mwst=mwst,
+        brutto=netto + mwst,
+    )
+
+def get_cart_totals(cart):
+    """Preise des Warenkorbs in Cent - einmal pro Inhalt berechnet, geteilt von Warenkorb und PDF (nur lesen!)
+
+    positionen: CartItem.key -> (Reifen netto, Services netto, Position netto)
+    """
+    return _compute_cart_totals(cart_content_key(cart))
 
 # ================================================================================================
 # FORMATIERUNGS-FUNKTIONEN FÜR PDF
 # ================================================================================================
-def format_currency_german(value: float) -> str:
-    """Formatiert Euro-Beträge im deutschen Format"""
-    s = f"{value:,.2f}"
-    s = s.replace(",", "X").replace(".", ",").replace("X", ".")
-    return s
-
 def format_date_german(date_obj):
     """Formatiert Datum als deutschen String (DD.MM.YYYY)"""
     if not date_obj:
@@ -1023,11 +1019,123 @@ def create_header_footer(canvas, doc):
 
     canvas.restoreState()
 
-def create_professional_pdf(customer_data, detected_season, cart_items, cart_quantities, cart_services, selected_filial_info, selected_mitarbeiter_info):
-    """Erstellt PDF mit optimiertem Layout - MWST-TABELLE AUF SEITE 1, ZWISCHENSUMME ENTFERNT"""
-    if not cart_items:
+# ================================================================================================
+# PDF-CACHE - FERTIGE ANGEBOTE JE INHALT, LRU NACH GESAMTGRÖSSE
+# ================================================================================================
+PDF_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+class PdfRenderCache:
+    """Fertige PDF-Bytes je Inhalts-Hash, prozessweit geteilt.
+
+    Übersteigt die Summe der gespeicherten PDFs max_bytes, fallen die am
+    längsten nicht abgerufenen Einträge heraus. Treffer, Fehlschläge und
+    Verdrängungen werden für die Verwaltungsseiten mitgezählt.
+    """
+
+    def __init__(self, max_bytes=PDF_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """PDF-Bytes zum Schlüssel - None (und ein Fehlschlag) wenn nicht vorhanden"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        """Speichert ein PDF und verdrängt älteste Einträge bis die Größe wieder passt"""
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        """Leert den Cache und setzt die Zähler zurück"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+            }
+
+@st.cache_resource(show_spinner=False)
+def get_pdf_cache():
+    """Prozessweiter PDF-Cache - überlebt Reruns und wird von allen Sessions geteilt"""
+    return PdfRenderCache()
+
+def render_pdf_cache_stats():
+    """Trefferquote des PDF-Caches (fertige Angebote aus dem Warenkorb)"""
+    stats = get_pdf_cache().stats()
+    requests = stats['hits'] + stats['misses']
+    quote = f"{stats['hits'] / requests:.0%}" if requests else "-"
+    st.header("📄 PDF-Cache")
+    st.markdown(f"Treffer: **{stats['hits']}** | Neu erstellt: **{stats['misses']}** | Quote: **{quote}**")
+    st.caption(
+        f"{stats['entries']} PDF(s), {stats['bytes'] / 1024:.0f} KB von {stats['max_bytes'] / 1024 / 1024:.0f} MB "
+        f"belegt, {stats['evictions']} verdrängt"
+    )
+    if st.button("PDF-Cache leeren", use_container_width=True, key="clear_pdf_cache"):
+        get_pdf_cache().clear()
+        st.rerun()
+
+def pdf_content_key(customer_data, detected_season, cart, selected_filial_info, selected_mitarbeiter_info, date_today):
+    """Hash über alles, was im PDF steht - Kunde, Warenkorb, Filiale, Ansprechpartner und Datum"""
+    content = {
+        'kunde': customer_data or {},
+        'saison': detected_season,
+        'warenkorb': cart.to_list(),
+        'filiale': selected_filial_info or {},
+        'mitarbeiter': selected_mitarbeiter_info or {},
+        'datum': date_today.date().isoformat(),
+    }
+    payload = json.dumps(content, default=str, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def create_professional_pdf(customer_data, detected_season, cart, selected_filial_info, selected_mitarbeiter_info):
+    """PDF-Angebot - gleicher Inhalt am gleichen Tag kommt aus dem Cache statt neu gerendert"""
+    if not cart:
         return None
 
+    date_today = datetime.now()
+    key = pdf_content_key(customer_data, detected_season, cart, selected_filial_info, selected_mitarbeiter_info, date_today)
+    cache = get_pdf_cache()
+    pdf_data = cache.get(key)
+    if pdf_data is None:
+        pdf_data = _render_professional_pdf(
+            customer_data, detected_season, cart, selected_filial_info, selected_mitarbeiter_info, date_today
+        )
+        cache.put(key, pdf_data)
+    return pdf_data
+
+def _render_professional_pdf(customer_data, detected_season, cart, selected_filial_info, selected_mitarbeiter_info, date_today):
+    """Erstellt PDF mit optimiertem Layout - MWST-TABELLE AUF SEITE 1, ZWISCHENSUMME ENTFERNT"""
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(
         buffer,
@@ -1090,7 +1198,6 @@ def create_professional_pdf(customer_data, detected_season, cart_items, cart_qua
     )
 
     story = []
-    date_today = datetime.now()
     date_str = date_today.strftime('%d.%m.%Y')
 
     # === SEITE 1: FIRMENADRESSE + KUNDENDATEN ===
@@ -1224,48 +1331,44 @@ def create_professional_pdf(customer_data, detected_season, cart_items, cart_qua
     ]
     
     main_table_data = [main_headers]
-    total_netto, _ = get_cart_total(cart_items, cart_quantities, cart_services)
+    totals = get_cart_totals(cart)
+    total_netto = totals.netto
     position_counter = 1
     
     # ERST ALLE REIFEN
-    for item in cart_items:
-        quantity = cart_quantities.get(item['id'], 4)
-        reifen_kosten_netto = (item['Preis_EUR'] / 1.19) * quantity
+    for item in cart:
+        reifen_kosten_netto = totals.positionen[item.key][0]
         
         main_table_data.append([
             str(position_counter),
-            item['Teilenummer'],
-            f"{item['Reifengröße']} - {item['Fabrikat']} {item['Profil']}",
+            item.teilenummer,
+            f"{item.reifengroesse} - {item.fabrikat} {item.profil}",
             "",
-            format_currency_german(item['Preis_EUR'] / 1.19),
-            f"{quantity},00 Stück",
+            format_cents_german(netto_cents(item.preis_cent)),
+            f"{item.menge},00 Stück",
             "",
             "#3",
-            format_currency_german(reifen_kosten_netto)
+            format_cents_german(reifen_kosten_netto)
         ])
         position_counter += 1
     
     # DANN ALLE SERVICES - JEDES SERVICE ALS EIGENE POSITION
-    for item in cart_items:
-        selected_packages = cart_services.get(item['id'], [])
-        if selected_packages:
-            quantity = cart_quantities.get(item['id'], 4)
-            
+    for item in cart:
+        if item.services:
             # Jedes Service-Paket als eigene Position (keine Unterzeilen mehr)
-            for package in selected_packages:
-                brutto_pkg_price = float(package['preis'])
-                netto_pkg_price = brutto_pkg_price / 1.19
+            for package in item.services:
+                netto_pkg_price = netto_cents(package['preis_cent'])
                 
                 main_table_data.append([
                     str(position_counter),
                     package['positionsnummer'],
                     package['bezeichnung'].upper(),
                     "",
-                    format_currency_german(netto_pkg_price),
+                    format_cents_german(netto_pkg_price),
                     "1,00 Stück",  # Service-Pakete sind immer 1x (nicht quantity!)
                     "",
                     "#3",
-                    format_currency_german(netto_pkg_price)
+                    format_cents_german(netto_pkg_price)
                 ])
                 position_counter += 1
 
@@ -1327,18 +1430,17 @@ def create_professional_pdf(customer_data, detected_season, cart_items, cart_qua
     story.append(Spacer(1, 10))  # ERHÖHT: von 8 auf 10 - schönere Optik
 
     # Gesamtbetrag (netto)
-    story.append(Paragraph(f"Gesamtbetrag (netto): {format_currency_german(total_netto)}", 
+    story.append(Paragraph(f"Gesamtbetrag (netto): {format_cents_german(total_netto)}", 
                           ParagraphStyle('NettoTotal', parent=normal_style, alignment=TA_RIGHT)))
     story.append(Spacer(1, 12))  # ERHÖHT: von 10 auf 12 - schönere Optik
 
     # === NEUE MWST-TABELLE DIREKT HIER AUF SEITE 1 - IM FAHRZEUGDATEN-STIL ===
     # Material/Arbeit aufteilen aus breakdown
-    total_netto, breakdown = get_cart_total(cart_items, cart_quantities, cart_services)
-    material_kosten = breakdown['reifen']    # Reifen = Material
-    arbeit_kosten = breakdown['services']    # Service-Pakete = Arbeit
+    material_kosten = totals.reifen    # Reifen = Material
+    arbeit_kosten = totals.services    # Service-Pakete = Arbeit
     
-    mwst_betrag = total_netto * 0.19
-    brutto_gesamt = total_netto + mwst_betrag
+    mwst_betrag = totals.mwst
+    brutto_gesamt = totals.brutto
 
     mwst_headers = [
         "Steuer-\nCode", "Arbeit", "Material", "Steuerbasis", "%-Mwst", 
@@ -1349,25 +1451,25 @@ def create_professional_pdf(customer_data, detected_season, cart_items, cart_qua
         mwst_headers,
         [
             "#3", 
-            format_currency_german(arbeit_kosten),   # Service-Pakete in Arbeit
-            format_currency_german(material_kosten), # Reifen in Material
-            format_currency_german(total_netto), 
+            format_cents_german(arbeit_kosten),   # Service-Pakete in Arbeit
+            format_cents_german(material_kosten), # Reifen in Material
+            format_cents_german(total_netto), 
             "19%", 
-            format_currency_german(mwst_betrag), 
+            format_cents_german(mwst_betrag), 
             "0,00", 
             "0,00", 
             ""
         ],
         [
             "Summe", 
-            format_currency_german(arbeit_kosten),   # Service-Pakete in Arbeit
-            format_currency_german(material_kosten), # Reifen in Material
-            format_currency_german(total_netto), 
+            format_cents_german(arbeit_kosten),   # Service-Pakete in Arbeit
+            format_cents_german(material_kosten), # Reifen in Material
+            format_cents_german(total_netto), 
             "", 
-            format_currency_german(mwst_betrag), 
+            format_cents_german(mwst_betrag), 
             "0,00", 
             "", 
-            format_currency_german(brutto_gesamt)
+            format_cents_german(brutto_gesamt)
         ]
     ]
 
@@ -1507,9 +1609,9 @@ def create_mailto_link(customer_email, email_text, detected_season):
 # ================================================================================================
 # TD-ANFRAGE FUNKTIONEN - UNVERÄNDERT
 # ================================================================================================
-def create_td_email_text(customer_data, detected_season, cart_items, cart_quantities):
+def create_td_email_text(customer_data, detected_season, cart):
     """Erstellt den E-Mail-Text für die TD-Anfrage"""
-    if not cart_items:
+    if not cart:
         return ""
     
     # Kopf der E-Mail
@@ -1548,28 +1650,24 @@ def create_td_email_text(customer_data, detected_season, cart_items, cart_quanti
     email_content += "REIFENANFRAGE:\r\n"
     email_content += "="*50 + "\r\n\r\n"
     
-    for i, item in enumerate(cart_items, 1):
-        quantity = cart_quantities.get(item['id'], 4)
-        
+    for i, item in enumerate(cart, 1):
         email_content += f"Position {i}:\r\n"
-        email_content += f"Reifengröße: {item['Reifengröße']}\r\n"
-        email_content += f"Fabrikat: {item['Fabrikat']}\r\n"
-        email_content += f"Profil: {item['Profil']}\r\n"
-        email_content += f"Teilenummer: {item['Teilenummer']}\r\n"
-        email_content += f"Stückzahl: {quantity} Stück\r\n"
-        email_content += f"Aktueller Preis: {item['Preis_EUR']:.2f} EUR\r\n"
+        email_content += f"Reifengröße: {item.reifengroesse}\r\n"
+        email_content += f"Fabrikat: {item.fabrikat}\r\n"
+        email_content += f"Profil: {item.profil}\r\n"
+        email_content += f"Teilenummer: {item.teilenummer}\r\n"
+        email_content += f"Stückzahl: {item.menge} Stück\r\n"
+        email_content += f"Aktueller Preis: {format_cents(item.preis_cent)} EUR\r\n"
         
-        if item.get('Saison'):
-            email_content += f"Saison: {item['Saison']}\r\n"
+        if item.saison:
+            email_content += f"Saison: {item.saison}\r\n"
         
         # EU-Label Informationen falls vorhanden
         eu_info = []
-        if item.get('Kraftstoffeffizienz'):
-            eu_info.append(f"Kraftstoffeffizienz: {item['Kraftstoffeffizienz']}")
-        if item.get('Nasshaftung'):
-            eu_info.append(f"Nasshaftung: {item['Nasshaftung']}")
-        if item.get('Geräuschemissionen'):
-            eu_info.append(f"Geräusch: {item['Geräuschemissionen']}")
+        if item.kraftstoffeffizienz:
+            eu_info.append(f"Kraftstoffeffizienz: {item.kraftstoffeffizienz}")
+        if item.nasshaftung:
+            eu_info.append(f"Nasshaftung: {item.nasshaftung}")
         
         if eu_info:
             email_content += f"EU-Label: {' | '.join(eu_info)}\r\n"
@@ -1578,9 +1676,9 @@ def create_td_email_text(customer_data, detected_season, cart_items, cart_quanti
     
     return email_content
 
-def create_td_mailto_link(td_email_text, cart_items):
+def create_td_mailto_link(td_email_text, cart):
     """Erstellt den mailto-Link für die TD-Anfrage - KEIN Empfänger vorgefüllt"""
-    subject = f"Reifenanfrage Ramsperger Automobile - {len(cart_items)} Position(en)"
+    subject = f"Reifenanfrage Ramsperger Automobile - {len(cart)} Position(en)"
     body_crlf = _normalize_crlf(td_email_text)
     subject_encoded = urllib.parse.quote(subject, safe="")
     body_encoded = _urlencode_mail_body(body_crlf)
@@ -0,0 +1,293 @@
+import hashlib
+import json
+import sqlite3
+import uuid
+from contextlib import closing
+from datetime import date, datetime
+from pathlib import Path
+
+import streamlit as st
+
+from utils.catalog import BASE_DIR
+from utils.cart import Cart
+from utils.pdf_generator import get_cart_totals, get_filial_info, get_mitarbeiter_for_filial
+
+# ================================================================================================
+# ANGEBOTS-SPEICHER - SQLITE, EIN DATENSATZ JE ANGEBOT
+# ================================================================================================
+# Warenkorb und Kundendaten einer Session werden bei jeder Änderung gespeichert. Die Angebots-ID
+# steht in der URL (?angebot=...), so übersteht ein Angebot Neuladen und Server-Neustart.
+QUOTES_DB = BASE_DIR / "angebote.sqlite"
+QUOTE_PARAM = "angebot"
+
+STATUS_OFFEN = "offen"
+STATUS_ABGESCHLOSSEN = "abgeschlossen"
+STATUS_VERWORFEN = "verworfen"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS angebote (
+    quote_id    TEXT PRIMARY KEY,
+    filiale     TEXT NOT NULL DEFAULT '',
+    berater     TEXT NOT NULL DEFAULT '',
+    status      TEXT NOT NULL DEFAULT 'offen',
+    erstellt    TEXT NOT NULL,
+    geaendert   TEXT NOT NULL,
+    kunde       TEXT NOT NULL DEFAULT '',
+    positionen  INTEGER NOT NULL DEFAULT 0,
+    netto_cent  INTEGER NOT NULL DEFAULT 0,
+    inhalt_hash TEXT NOT NULL DEFAULT '',
+    kundendaten TEXT NOT NULL DEFAULT '{}',
+    warenkorb   TEXT NOT NULL DEFAULT '[]',
+    version     INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_angebote_berater_datum ON angebote (berater, status, geaendert);
+CREATE INDEX IF NOT EXISTS idx_angebote_filiale_datum ON angebote (filiale, status, geaendert);
+"""
+
+# Übersicht ohne die JSON-Spalten - reicht für Listen offener Angebote
+_LIST_COLUMNS = "quote_id, filiale, berater, status, erstellt, geaendert, kunde, positionen, netto_cent"
+
+@st.cache_resource(show_spinner=False)
+def _ensure_schema(path):
+    """Legt Datenbank, Tabelle und Indizes einmal pro Prozess an"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with closing(sqlite3.connect(path)) as connection:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(_SCHEMA)
+        # Datenbanken aus der ersten Version haben noch keine Versionsspalte
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(angebote)")}
+        if 'version' not in columns:
+            connection.execute("ALTER TABLE angebote ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+            connection.commit()
+    return True
+
+def _connect():
+    """Kurzlebige Verbindung - sqlite3-Verbindungen sind nicht zwischen Threads teilbar"""
+    _ensure_schema(str(QUOTES_DB))
+    connection = sqlite3.connect(QUOTES_DB, timeout=5)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+def new_quote_id():
+    """Lesbare, eindeutige Angebots-ID, z.B. '20251018-1a2b3c4d'"""
+    return f"{datetime.now():%Y%m%d}-{uuid.uuid4().hex[:8]}"
+
+def save_quote(quote_id, version, filiale, berater, kunde, positionen, netto_cent, inhalt_hash, kundendaten, warenkorb):
+    """Legt ein Angebot an (version None) oder aktualisiert es (kundendaten/warenkorb als JSON-Text).
+
+    Aktualisiert wird nur, solange das Angebot offen ist und noch die erwartete
+    Version hat - der Status bleibt dabei unverändert. Liefert die neue Version,
+    None bei einem Konflikt (anderes Fenster hat gespeichert, Angebot abgeschlossen).
+    """
+    now = _now()
+    with closing(_connect()) as connection, connection:
+        if version is None:
+            connection.execute(
+                """
+                INSERT INTO angebote (quote_id, filiale, berater, status, erstellt, geaendert, kunde,
+                                      positionen, netto_cent, inhalt_hash, kundendaten, warenkorb, version)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+                """,
+                (quote_id, filiale, berater, STATUS_OFFEN, now, now, kunde,
+                 positionen, netto_cent, inhalt_hash, kundendaten, warenkorb),
+            )
+            return 1
+        cursor = connection.execute(
+            """
+            UPDATE angebote SET
+                filiale = ?, berater = ?, geaendert = ?, kunde = ?, positionen = ?, netto_cent = ?,
+                inhalt_hash = ?, kundendaten = ?, warenkorb = ?, version = version + 1
+            WHERE quote_id = ? AND version = ? AND status = ?
+            """,
+            (filiale, berater, now, kunde, positionen, netto_cent, inhalt_hash, kundendaten, warenkorb,
+             quote_id, version, STATUS_OFFEN),
+        )
+        return version + 1 if cursor.rowcount == 1 else None
+
+def load_quote(quote_id):
+    """Ein Angebot als Dict - None wenn die ID unbekannt ist"""
+    with closing(_connect()) as connection:
+        row = connection.execute("SELECT * FROM angebote WHERE quote_id = ?", (quote_id,)).fetchone()
+    return dict(row) if row is not None else None
+
+def list_quotes(filiale, berater=None, status=STATUS_OFFEN, limit=50):
+    """Angebote einer Filiale (optional nur eines Beraters), neueste zuerst - nutzt die Indizes"""
+    conditions, params = ["status = ?", "filiale = ?"], [status, filiale]
+    if berater:
+        conditions.append("berater = ?")
+        params.append(berater)
+    with closing(_connect()) as connection:
+        rows = connection.execute(
+            f"SELECT {_LIST_COLUMNS} FROM angebote WHERE {' AND '.join(conditions)} "
+            "ORDER BY geaendert DESC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def set_quote_status(quote_id, status):
+    """Schließt ein offenes Angebot ab oder verwirft es - andere Fenster mit dem Angebot merken das beim Speichern"""
+    with closing(_connect()) as connection, connection:
+        connection.execute(
+            "UPDATE angebote SET status = ?, geaendert = ?, version = version + 1 WHERE quote_id = ? AND status = ?",
+            (status, _now(), quote_id, STATUS_OFFEN),
+        )
+
+# ================================================================================================
+# JSON MIT DATUMSFELDERN (st.date_input liefert datetime.date)
+# ================================================================================================
+def _json_default(value):
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"Nicht speicherbar: {type(value).__name__}")
+
+def _json_object_hook(obj):
+    if set(obj) == {"__date__"}:
+        return date.fromisoformat(obj["__date__"])
+    return obj
+
+def _dumps(value):
+    return json.dumps(value, default=_json_default, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+# ================================================================================================
+# SESSION-ANBINDUNG - SPEICHERN BEI ÄNDERUNG, WIEDERHERSTELLEN BEIM LADEN
+# ================================================================================================
+def _berater_name():
+    return (st.session_state.get('selected_mitarbeiter_info') or {}).get('name', '')
+
+def _remember_quote(quote_id, version, inhalt_hash):
+    st.session_state.quote_id = quote_id
+    st.session_state.quote_version = version
+    st.session_state.quote_hash = inhalt_hash
+    st.session_state.quote_conflict = False
+    st.query_params[QUOTE_PARAM] = quote_id
+
+def save_quote_session():
+    """Speichert Warenkorb und Kundendaten der Session - nur wenn sich der Inhalt geändert hat.
+
+    Hat ein anderes Fenster dasselbe Angebot inzwischen gespeichert, wird nichts
+    überschrieben: die Session merkt sich den Konflikt, bis er im Warenkorb
+    aufgelöst ist. Ist das Angebot nicht mehr offen, werden die Änderungen als
+    neues Angebot gespeichert.
+    """
+    cart = st.session_state.get('cart')
+    quote_id = st.session_state.get('quote_id')
+    if cart is None or (not cart and quote_id is None):
+        return
+    if st.session_state.get('quote_conflict'):
+        return
+    if not cart:
+        # Leerer Warenkorb - das Angebot gilt als verworfen
+        close_quote_session(STATUS_VERWORFEN)
+        return
+    customer_data = st.session_state.get('customer_data', {})
+    filiale = st.session_state.get('selected_filial', '')
+    berater = _berater_name()
+    warenkorb = _dumps(cart.to_list())
+    kundendaten = _dumps(customer_data)
+    inhalt_hash = hashlib.sha1("\x1f".join((warenkorb, kundendaten, filiale, berater)).encode("utf-8")).hexdigest()
+    if quote_id is not None and inhalt_hash == st.session_state.get('quote_hash'):
+        return
+
+    values = (filiale, berater, customer_data.get('name', ''), len(cart),
+              get_cart_totals(cart).netto, inhalt_hash, kundendaten, warenkorb)
+    try:
+        if quote_id is None:
+            quote_id = new_quote_id()
+            version = save_quote(quote_id, None, *values)
+        else:
+            version = save_quote(quote_id, st.session_state.get('quote_version'), *values)
+            if version is None:
+                current = load_quote(quote_id)
+                if current is not None and current['status'] == STATUS_OFFEN:
+                    st.session_state.quote_conflict = True
+                    st.warning(
+                        f"Angebot {quote_id} wurde in einem anderen Fenster geändert - "
+                        "Ihre Änderungen sind noch nicht gespeichert. Bitte im Warenkorb entscheiden, welcher Stand gilt."
+                    )
+                    return
+                # Abgeschlossen, verworfen oder gelöscht - nicht wieder öffnen, sondern neu anlegen
+                previous_id, status = quote_id, current['status'] if current is not None else "gelöscht"
+                quote_id = new_quote_id()
+                version = save_quote(quote_id, None, *values)
+                st.warning(
+                    f"Angebot {previous_id} ist bereits {status} - "
+                    f"die Änderungen wurden als neues Angebot {quote_id} gespeichert."
+                )
+    except sqlite3.Error as e:
+        st.error(f"Fehler beim Speichern des Angebots: {e}")
+        return
+    _remember_quote(quote_id, version, inhalt_hash)
+
+def keep_own_quote_version():
+    """Callback bei Konflikt: den Stand dieser Session behalten - er überschreibt beim nächsten Lauf den anderen"""
+    try:
+        quote = load_quote(st.session_state.get('quote_id'))
+    except sqlite3.Error as e:
+        st.error(f"Fehler beim Laden des Angebots: {e}")
+        return
+    if quote is not None:
+        st.session_state.quote_version = quote['version']
+    st.session_state.quote_hash = None
+    st.session_state.quote_conflict = False
+
+def open_quote(quote_id):
+    """Lädt ein offenes Angebot in die Session - False wenn es nicht existiert oder nicht mehr offen ist"""
+    try:
+        quote = load_quote(quote_id)
+    except sqlite3.Error as e:
+        st.error(f"Fehler beim Laden des Angebots: {e}")
+        return False
+    if quote is None:
+        st.warning(f"Angebot {quote_id} nicht gefunden.")
+        return False
+    if quote['status'] != STATUS_OFFEN:
+        st.warning(f"Angebot {quote_id} ist bereits {quote['status']} und kann nicht weiterbearbeitet werden.")
+        return False
+
+    st.session_state.cart = Cart.from_list(json.loads(quote['warenkorb']))
+    st.session_state.customer_data = json.loads(quote['kundendaten'], object_hook=_json_object_hook)
+    # Filiale und Ansprechpartner samt Widget-Keys vorbelegen
+    if quote['filiale']:
+        mitarbeiter = get_mitarbeiter_for_filial(quote['filiale'])
+        namen = [m['name'] for m in mitarbeiter]
+        st.session_state.selected_filial_key = quote['filiale']
+        st.session_state.selected_filial = quote['filiale']
+        st.session_state.selected_filial_info = get_filial_info(quote['filiale'])
+        if quote['berater'] in namen:
+            index = namen.index(quote['berater'])
+            st.session_state.selected_mitarbeiter_key = index
+            st.session_state.selected_mitarbeiter = index
+            st.session_state.selected_mitarbeiter_info = mitarbeiter[index]
+    _remember_quote(quote_id, quote['version'], quote['inhalt_hash'])
+    return True
+
+def restore_quote_session():
+    """Holt beim ersten Lauf einer Session das Angebot aus der URL zurück (Neuladen, Neustart)"""
+    if 'quote_id' in st.session_state:
+        # Laufende Session - die ID bleibt auch nach Seitenwechseln in der URL
+        quote_id = st.session_state.quote_id
+        if quote_id and st.query_params.get(QUOTE_PARAM) != quote_id:
+            st.query_params[QUOTE_PARAM] = quote_id
+        return
+    st.session_state.quote_id = None
+    quote_id = st.query_params.get(QUOTE_PARAM)
+    if quote_id and not open_quote(quote_id):
+        del st.query_params[QUOTE_PARAM]
+
+def close_quote_session(status):
+    """Beendet das aktuelle Angebot (abgeschlossen/verworfen) - der nächste Reifen startet ein neues"""
+    quote_id = st.session_state.get('quote_id')
+    if quote_id:
+        try:
+            set_quote_status(quote_id, status)
+        except sqlite3.Error as e:
+            st.error(f"Fehler beim Speichern des Angebots: {e}")
+    st.session_state.quote_id = None
+    st.session_state.quote_version = None
+    st.session_state.quote_hash = None
+    st.session_state.quote_conflict = False
+    if QUOTE_PARAM in st.query_params:
+        del st.query_params[QUOTE_PARAM]
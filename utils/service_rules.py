@@ -0,0 +1,137 @@
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+# ================================================================================================
+# REGELN DER SERVICE-PAKETE - ZOLL-BEREICHE UND WERTELISTEN
+# ================================================================================================
+# Spalte der Service-CSV -> Art der Regel. Weitere Spalten (z.B. Saison) greifen, sobald
+# sie in der CSV vorhanden sind - eine leere Zelle bedeutet keine Einschränkung. Regeln
+# gehen nur auf Spalten, die Katalog und Warenkorb-Positionen beide kennen.
+RULE_COLUMNS = {
+    "Zoll": "bereich",
+    "Saison": "werte",
+}
+
+# Gibt es im Reifen-Katalog nicht - eine Regel darauf würde jeden Reifen ausschließen
+UNSUPPORTED_RULE_COLUMNS = ("RF",)
+
+UNBEGRENZT = [(-math.inf, math.inf)]
+_NUMBER = r"\d+(?:\.\d+)?"
+_COMPARISON = re.compile(rf"(<=|>=|<|>|=)\s*({_NUMBER})")
+_RANGE = re.compile(rf"({_NUMBER})?\s*-\s*({_NUMBER})?")
+
+def parse_range_rule(text):
+    """Bereichsregel als Liste geschlossener Intervalle (min, max).
+
+    Erlaubt '16-17', '-17', '20-', '<=15', '>=21', '<15', '>20', '16' und
+    mehrere Teile mit Komma oder Semikolon ('15, 18-19'). Leere oder nicht
+    lesbare Regeln gelten wie bisher für alle Größen.
+    """
+    if text is None or pd.isna(text) or str(text).strip() == '':
+        return UNBEGRENZT
+    intervals = []
+    for part in re.split(r"[,;]", str(text)):
+        part = part.strip()
+        if not part:
+            continue
+        comparison = _COMPARISON.fullmatch(part)
+        if comparison:
+            op, value = comparison.group(1), float(comparison.group(2))
+            intervals.append({
+                "<=": (-math.inf, value),
+                "<": (-math.inf, float(np.nextafter(value, -math.inf))),
+                ">=": (value, math.inf),
+                ">": (float(np.nextafter(value, math.inf)), math.inf),
+                "=": (value, value),
+            }[op])
+            continue
+        bounds = _RANGE.fullmatch(part)
+        if bounds and (bounds.group(1) or bounds.group(2)):
+            intervals.append((float(bounds.group(1)) if bounds.group(1) else -math.inf,
+                              float(bounds.group(2)) if bounds.group(2) else math.inf))
+            continue
+        try:
+            intervals.append((float(part), float(part)))
+        except ValueError:
+            return UNBEGRENZT
+    return intervals or UNBEGRENZT
+
+def parse_value_rule(text):
+    """Werteliste wie 'Winter, Ganzjahres' als Menge in Großbuchstaben - None ohne Einschränkung"""
+    if text is None or pd.isna(text) or str(text).strip() == '':
+        return None
+    values = frozenset(part.strip().upper() for part in re.split(r"[,;]", str(text)) if part.strip())
+    return values or None
+
+def unsupported_rules(df):
+    """Positionsnummern je nicht unterstützter Regel-Spalte, z.B. {'RF': ['Z4409']} - leer wenn alles passt"""
+    found = {}
+    for column in UNSUPPORTED_RULE_COLUMNS:
+        if column not in df.columns:
+            continue
+        filled = df[column].notna() & (df[column].astype(str).str.strip() != '')
+        if filled.any():
+            found[column] = df.loc[filled, 'Positionsnummer'].astype(str).tolist()
+    return found
+
+def _column_values(tires, column):
+    """Werte einer Spalte aus DataFrame oder Liste von Dicts/Warenkorb-Positionen - None wenn die Spalte fehlt"""
+    if isinstance(tires, pd.DataFrame):
+        return tires[column].tolist() if column in tires.columns else [None] * len(tires)
+    return [tire.get(column) for tire in tires]
+
+class ServiceRules:
+    """Kompilierte Regeln aller Pakete einer Service-Konfiguration.
+
+    Bereichsregeln liegen als flache Intervall-Arrays vor, Wertelisten als
+    Mengen je Paket. eligibility() prüft damit beliebig viele Reifen gegen
+    alle Pakete in einem Durchlauf.
+    """
+
+    def __init__(self, df):
+        self.n_packages = len(df)
+        self.ranges = {}
+        self.values = {}
+        for column, kind in RULE_COLUMNS.items():
+            if column not in df.columns:
+                continue
+            if kind == "bereich":
+                ids, lower, upper = [], [], []
+                for package, text in enumerate(df[column]):
+                    for low, high in parse_range_rule(text):
+                        ids.append(package)
+                        lower.append(low)
+                        upper.append(high)
+                self.ranges[column] = (
+                    np.array(ids, dtype=np.int64), np.array(lower, dtype=float), np.array(upper, dtype=float)
+                )
+            else:
+                self.values[column] = [parse_value_rule(text) for text in df[column]]
+        self.columns = list(self.ranges) + list(self.values)
+
+    def eligibility(self, tires):
+        """Bool-Matrix (Pakete x Reifen) - tires ist ein DataFrame oder eine Liste von Dicts/CartItems"""
+        result = np.ones((self.n_packages, len(tires)), dtype=bool)
+        if len(tires) == 0:
+            return result
+        for column, (ids, lower, upper) in self.ranges.items():
+            values = pd.to_numeric(pd.Series(_column_values(tires, column), dtype=object), errors='coerce').to_numpy(dtype=float)
+            hits = (lower[:, None] <= values) & (values <= upper[:, None])
+            # Unbegrenzte Regeln passen auch auf Reifen ohne Angabe
+            hits |= (np.isneginf(lower) & np.isposinf(upper))[:, None]
+            matches = np.zeros_like(result)
+            np.logical_or.at(matches, ids, hits)
+            result &= matches
+        for column, rules in self.values.items():
+            values = np.array(
+                ["" if value is None or pd.isna(value) else str(value).strip().upper()
+                 for value in _column_values(tires, column)],
+                dtype=object,
+            )
+            for package, allowed in enumerate(rules):
+                if allowed is not None:
+                    result[package] &= np.isin(values, list(allowed))
+        return result
@@ -0,0 +1,63 @@
+import re
+from collections import namedtuple
+
+# ================================================================================================
+# FREITEXT-GRÖSSENSUCHE - "205/55 R16 91H", "2055516", "R16"
+# ================================================================================================
+SizeQuery = namedtuple("SizeQuery", ["breite", "hoehe", "zoll", "loadindex", "speedindex"])
+
+# Reifengröße wie auf der Reifenflanke: Trenner zwischen den Maßen optional,
+# Bauart R/ZR/RF vor dem Zoll optional, Last- und Geschwindigkeitsindex optional
+# ("91H", "91", "H" - ein Buchstabe allein nur nach vollständiger Größe, siehe
+# parse_size_query), Zusätze wie XL oder RunFlat-Kennungen am Ende werden ignoriert
+SIZE_PATTERN = re.compile(
+    r"""
+    (?P<breite>\d{3})
+    (?:\s*[/\-\s]?\s*(?P<hoehe>\d{2})
+       (?:\s*[/\-\s]?\s*(?:ZR|RF|R)?\s*(?P<zoll>\d{2}))?
+    )?
+    (?:\s+(?P<loadindex>\d{2,3}(?:/\d{2,3})?)?\s*(?P<speedindex>[A-Z])?)?
+    (?:\s+(?:XL|RF|RFT|ROF|SSR|ZP))*
+    """,
+    re.VERBOSE,
+)
+# Nur Felgengröße: "R16", "16 Zoll", '16"'
+ZOLL_PATTERN = re.compile(r'(?:R\s*(?P<zoll>\d{2})|(?P<zoll_wort>\d{2})\s*(?:ZOLL|"))')
+
+def parse_size_query(text):
+    """Zerlegt eine Größeneingabe in Breite/Hoehe/Zoll/Loadindex/Speedindex - None wenn nicht erkannt"""
+    if not text or not text.strip():
+        return None
+    text = " ".join(text.upper().split())
+
+    match = SIZE_PATTERN.fullmatch(text)
+    if match:
+        values = match.groupdict()
+        # "205 R" ist keine Größe mit Geschwindigkeitsindex - der Buchstabe zählt nur nach dem Zoll
+        if values["speedindex"] and not values["loadindex"] and not values["zoll"]:
+            return None
+        return SizeQuery(
+            breite=int(values["breite"]),
+            hoehe=int(values["hoehe"]) if values["hoehe"] else None,
+            zoll=int(values["zoll"]) if values["zoll"] else None,
+            loadindex=values["loadindex"],
+            speedindex=values["speedindex"],
+        )
+
+    match = ZOLL_PATTERN.fullmatch(text)
+    if match:
+        return SizeQuery(None, None, int(match.group("zoll") or match.group("zoll_wort")), None, None)
+    return None
+
+def format_size_query(query):
+    """Anzeige einer erkannten Größe in Flanken-Schreibweise, z.B. '205/55 R16 91H'"""
+    text = ""
+    if query.breite is not None:
+        text = str(query.breite)
+        if query.hoehe is not None:
+            text += f"/{query.hoehe}"
+    if query.zoll is not None:
+        text += f" R{query.zoll}"
+    if query.loadindex or query.speedindex:
+        text += f" {query.loadindex or ''}{query.speedindex or ''}"
+    return text.strip()
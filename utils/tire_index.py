@@ -0,0 +1,424 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# ================================================================================================
+# GRÖSSEN-INDEX (BREITE / HOEHE / ZOLL)
+# ================================================================================================
+EMPTY_POSITIONS = np.empty(0, dtype=np.int64)
+
+def group_positions(df, columns):
+    """Zeilenpositionen je Wert bzw. Wertekombination der Spalten"""
+    if df.empty:
+        return {}
+    groups = df.groupby(columns, sort=False, observed=True).indices
+    if isinstance(columns, list):
+        return {tuple(int(v) for v in key): pos for key, pos in groups.items()}
+    return {int(key): pos for key, pos in groups.items()}
+
+class SizeIndex:
+    """Index von (Breite, Hoehe, Zoll) und von jedem Einzelattribut auf Zeilenpositionen.
+
+    Wird einmal pro Katalog-Version gebaut. Abfragen werden über
+    Schnittmengen der sortierten Positionslisten aufgelöst statt über
+    Vergleiche auf dem ganzen DataFrame.
+    """
+
+    ATTRIBUTES = ("Breite", "Hoehe", "Zoll")
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.by_size = group_positions(df, list(self.ATTRIBUTES))
+        self.by_attribute = {attr: group_positions(df, attr) for attr in self.ATTRIBUTES}
+
+    def lookup(self, breite=None, hoehe=None, zoll=None, size=None):
+        """Positionen passend zu allen gesetzten Werten - None bedeutet keine Einschränkung"""
+        if size is None and None not in (breite, hoehe, zoll):
+            size = (int(breite), int(hoehe), int(zoll))
+            return self.by_size.get(size, EMPTY_POSITIONS)
+        candidates = []
+        if size is not None:
+            candidates.append(self.by_size.get(tuple(size), EMPTY_POSITIONS))
+        for attr, value in zip(self.ATTRIBUTES, (breite, hoehe, zoll)):
+            if value is not None:
+                candidates.append(self.by_attribute[attr].get(int(value), EMPTY_POSITIONS))
+
+        if not candidates:
+            return np.arange(self.n_rows)
+        candidates.sort(key=len)
+        result = candidates[0]
+        for positions in candidates[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, positions, assume_unique=True)
+        return result
+
+# ================================================================================================
+# BITMAP-INDEX FÜR KATEGORIEN UND BESTAND
+# ================================================================================================
+BITMAP_COLUMNS = ("Zoll", "Breite", "Hoehe", "Saison", "Fabrikat", "Loadindex", "Speedindex", "RF")
+
+class BitmapIndex:
+    """Ein gepacktes Bitset (np.packbits) je Spaltenwert plus abgeleitete Bitsets.
+
+    Filterkombinationen werden mit bitweisem UND/ODER aufgelöst, erst das
+    Ergebnis wird in Zeilenpositionen umgewandelt. Werte werden als Text
+    verglichen - 16 und "16" treffen dasselbe Bitset.
+    """
+
+    def __init__(self, df, columns=BITMAP_COLUMNS):
+        self.n_rows = len(df)
+        self.empty = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        self.full = np.packbits(np.ones(self.n_rows, dtype=bool))
+        self.bitmaps = {}
+        for col in columns:
+            if col not in df.columns:
+                continue
+            values = df[col].astype("category")
+            codes = values.cat.codes.to_numpy()
+            self.bitmaps[col] = {
+                str(value): np.packbits(codes == i) for i, value in enumerate(values.cat.categories)
+            }
+        self.derived = {}
+
+    def add(self, name, mask):
+        """Abgeleitetes Bitset aus einer booleschen Maske, z.B. positiver Bestand"""
+        self.derived[name] = np.packbits(np.asarray(mask, dtype=bool))
+
+    def get(self, name):
+        return self.derived.get(name, self.empty)
+
+    def value(self, col, value):
+        """Bitset der Zeilen mit Spalte == Wert"""
+        return self.bitmaps.get(col, {}).get(str(value), self.empty)
+
+    def any_of(self, col, values):
+        """Bitset der Zeilen mit Spalte in Werte (ODER)"""
+        result = self.empty
+        for value in values:
+            result = result | self.value(col, value)
+        return result
+
+    def to_mask(self, bits):
+        return np.unpackbits(bits, count=self.n_rows).astype(bool)
+
+    def to_positions(self, bits):
+        return np.flatnonzero(np.unpackbits(bits, count=self.n_rows))
+
+# ================================================================================================
+# SUCHINDEX - TEILSTRING- UND PRÄFIXSUCHE
+# ================================================================================================
+SEARCH_FIELDS = ("Teilenummer", "Fabrikat", "Profil")
+
+class SearchIndex:
+    """Trigramm-Index über die großgeschriebenen Werte von Teilenummer, Fabrikat und Profil.
+
+    Indiziert werden die eindeutigen Werte je Feld, über die Kategorie-Codes
+    wird auf Zeilen zurückgerechnet. Ein Suchbegriff ab drei Zeichen prüft nur
+    noch die Werte, die alle seine Trigramme enthalten. Für Teilenummern gibt
+    es zusätzlich eine Präfixsuche über ein sortiertes Array.
+    """
+
+    N = 3
+
+    def __init__(self, df, fields=SEARCH_FIELDS):
+        self.n_rows = len(df)
+        self._fields = {}
+        for field in fields:
+            if field not in df.columns:
+                continue
+            values = df[field].astype("category")
+            uniques = [str(v).upper() for v in values.cat.categories]
+            grams = {}
+            for value_id, value in enumerate(uniques):
+                for gram in {value[i:i + self.N] for i in range(len(value) - self.N + 1)}:
+                    grams.setdefault(gram, []).append(value_id)
+            grams = {gram: np.array(ids, dtype=np.int64) for gram, ids in grams.items()}
+            self._fields[field] = (uniques, values.cat.codes.to_numpy(), grams)
+
+        if "Teilenummer" in self._fields:
+            uniques, codes, _ = self._fields["Teilenummer"]
+            valid = np.flatnonzero(codes >= 0)
+            keys = np.array(uniques, dtype=object)[codes[valid]] if len(uniques) else np.empty(0, dtype=object)
+            order = np.argsort(keys, kind="stable")
+            self._prefix_keys = keys[order].astype(str)
+            self._prefix_positions = valid[order]
+        else:
+            self._prefix_keys = np.empty(0, dtype=str)
+            self._prefix_positions = EMPTY_POSITIONS
+
+    def _matching_values(self, field, term):
+        """IDs der eindeutigen Werte eines Felds, die den Begriff enthalten"""
+        uniques, _, grams = self._fields[field]
+        if len(term) < self.N:
+            return np.array([i for i, value in enumerate(uniques) if term in value], dtype=np.int64)
+        candidates = None
+        for gram in {term[i:i + self.N] for i in range(len(term) - self.N + 1)}:
+            ids = grams.get(gram)
+            if ids is None:
+                return EMPTY_POSITIONS
+            candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+        return np.array([i for i in candidates if term in uniques[i]], dtype=np.int64)
+
+    def contains(self, term, fields=SEARCH_FIELDS):
+        """Boolesche Maske aller Zeilen, bei denen eines der Felder den Begriff enthält"""
+        term = term.upper()
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for field in fields:
+            if field not in self._fields:
+                continue
+            _, codes, _ = self._fields[field]
+            mask |= np.isin(codes, self._matching_values(field, term))
+        return mask
+
+    def prefix(self, term):
+        """Zeilenpositionen der Teilenummern, die mit dem Begriff beginnen"""
+        term = term.upper()
+        start = np.searchsorted(self._prefix_keys, term, side="left")
+        end = np.searchsorted(self._prefix_keys, term + "\uffff", side="left")
+        return np.sort(self._prefix_positions[start:end])
+
+    def search(self, terms, fields=SEARCH_FIELDS):
+        """ODER über alle Begriffe - ein '*' am Ende sucht Teilenummern mit diesem Präfix"""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for term in terms:
+            if term.endswith("*") and len(term) > 1:
+                mask[self.prefix(term[:-1])] = True
+            else:
+                mask |= self.contains(term, fields)
+        return mask
+
+# ================================================================================================
+# FACETTEN - AUSWAHLWERTE PRO KATALOG-VERSION
+# ================================================================================================
+NUMERIC_FACETS = ("Zoll", "Breite", "Hoehe")
+TEXT_FACETS = ("Fabrikat", "Loadindex", "Speedindex")
+
+def build_facet_options(df):
+    """Sortierte Auswahlwerte je Facette - Zahlen als int, Text als str"""
+    options = {}
+    for col in NUMERIC_FACETS:
+        options[col] = sorted(int(v) for v in df[col].dropna().unique()) if col in df.columns else []
+    for col in TEXT_FACETS:
+        options[col] = sorted(str(v) for v in df[col].dropna().unique()) if col in df.columns else []
+    return options
+
+def build_price_range(df):
+    """(min, max) des Preises für den Slider"""
+    if df.empty or "Preis_EUR" not in df.columns:
+        return 0.0, 0.0
+    return float(df["Preis_EUR"].min()), float(df["Preis_EUR"].max())
+
+# ================================================================================================
+# FILTER-ENGINE MIT ZWISCHENERGEBNISSEN JE STUFE
+# ================================================================================================
+SORT_OPTIONS = {
+    "Preis aufsteigend": (["Preis_EUR"], True),
+    "Preis absteigend": (["Preis_EUR"], False),
+    "Fabrikat": (["Fabrikat", "Preis_EUR"], True),
+    "Reifengröße": (["Zoll", "Breite", "Hoehe", "Preis_EUR"], True),
+    "Saison": (["Saison", "Preis_EUR"], True),
+}
+
+# Filterstufen, die über ein Bitset je Wert aufgelöst werden
+BITMAP_STAGES = {
+    "zoll": "Zoll",
+    "saison": "Saison",
+    "fabrikat": "Fabrikat",
+    "loadindex": "Loadindex",
+    "speedindex": "Speedindex",
+}
+
+# Filterstufe -> Spalte der Facette, für die Trefferzahlen angezeigt werden
+FACET_STAGES = {
+    "breite": "Breite",
+    "hoehe": "Hoehe",
+    "fabrikat": "Fabrikat",
+    "loadindex": "Loadindex",
+    "speedindex": "Speedindex",
+}
+
+class FilterEngine:
+    """Filter-Kette auf Zeilenpositionen, die jedes Stufenergebnis zwischenspeichert.
+
+    Eine Abfrage ist eine Liste von Stufen (Name, Wert). Das Ergebnis jeder
+    Stufe wird unter dem Präfix aller bisherigen Filterwerte abgelegt - ändert
+    sich nur eine späte Stufe (z.B. Preis oder Sortierung), setzen die früheren
+    Stufen auf den bereits eingeengten Positionen auf. Pro Katalog-Version
+    gibt es eine Engine, der Cache gilt also prozessweit.
+    """
+
+    def __init__(self, df, size_index, max_entries=256):
+        self.df = df
+        self.size_index = size_index
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.bitmaps = BitmapIndex(df)
+        if "Bestand" in df.columns:
+            bestand = pd.to_numeric(df["Bestand"], errors="coerce")
+            self.bitmaps.add("bestand_positiv", (bestand.notna() & (bestand > 0)).to_numpy(dtype=bool))
+        self._preis = df["Preis_EUR"].to_numpy() if "Preis_EUR" in df.columns else None
+        self.facet_options = build_facet_options(df)
+        self._facet_codes = {col: self._build_facet_codes(col) for col in FACET_STAGES.values()}
+        # Größen als ein Schlüssel Zoll/Breite/Hoehe - sortiert wie sort_values(['Zoll', 'Breite', 'Hoehe'])
+        self._size_keys = (
+            df["Zoll"].to_numpy(dtype=np.int64) * 1_000_000
+            + df["Breite"].to_numpy(dtype=np.int64) * 1_000
+            + df["Hoehe"].to_numpy(dtype=np.int64)
+        )
+
+    def run(self, stages):
+        """Wendet die Stufen der Reihe nach an und liefert die Zeilenpositionen"""
+        positions = np.arange(len(self.df))
+        key = ()
+        for name, value in stages:
+            key += ((name, value),)
+            positions = self.cached(key, lambda: self._apply(name, value, positions))
+        return positions
+
+    def _prefix_bits(self, zoll, mit_bestand, saison):
+        """Zoll, Bestand und Saison in einem bitweisen UND"""
+        bits = self.bitmaps.full
+        if zoll is not None:
+            bits = bits & self.bitmaps.value("Zoll", zoll)
+        if mit_bestand:
+            bits = bits & self.bitmaps.get("bestand_positiv")
+        if saison is not None:
+            bits = bits & self.bitmaps.value("Saison", saison)
+        return bits
+
+    def _index_bits(self, loadindex, speedindex):
+        """Last- und Geschwindigkeitsindex der Größensuche - '99' trifft auch '99/97'"""
+        bits = self.bitmaps.full
+        for col, value in (("Loadindex", loadindex), ("Speedindex", speedindex)):
+            if value:
+                matching = [v for v in self.facet_options[col] if v == value or v.split("/")[0] == value]
+                bits = bits & self.bitmaps.any_of(col, matching)
+        return bits
+
+    def _apply_bitmaps(self, positions, bits):
+        if len(positions) == self.bitmaps.n_rows:
+            return self.bitmaps.to_positions(bits)
+        return positions[self.bitmaps.to_mask(bits)[positions]]
+
+    def cached(self, key, compute):
+        """Ergebnis aus dem Stufen-Cache oder neu berechnen und ablegen"""
+        result = self._get(key)
+        if result is None:
+            result = compute()
+            self._put(key, result)
+        return result
+
+    def _build_facet_codes(self, col):
+        """Je Zeile der Index des Werts in facet_options[col], -1 für fehlende Werte"""
+        options = self.facet_options[col]
+        if col not in self.df.columns or not options:
+            return np.full(len(self.df), -1, dtype=np.int64)
+        if col in NUMERIC_FACETS:
+            return np.searchsorted(np.asarray(options), self.df[col].to_numpy(dtype=np.int64))
+        values = self.df[col].astype("category")
+        position = {value: i for i, value in enumerate(options)}
+        mapping = np.array([position[str(v)] for v in values.cat.categories] + [-1], dtype=np.int64)
+        return mapping[values.cat.codes.to_numpy()]
+
+    def count_values(self, col, positions):
+        """Trefferzahl je Auswahlwert der Facette in einem Durchlauf (bincount)"""
+        options = self.facet_options[col]
+        codes = self._facet_codes[col][positions]
+        counts = np.bincount(codes[codes >= 0], minlength=len(options))
+        return {option: int(n) for option, n in zip(options, counts)}
+
+    def distinct_sizes(self, positions):
+        """Eindeutige (Breite, Hoehe, Zoll) der Positionen, sortiert nach Zoll, Breite, Hoehe"""
+        keys = np.unique(self._size_keys[positions])
+        return [(int(k // 1_000 % 1_000), int(k % 1_000), int(k // 1_000_000)) for k in keys]
+
+    def _apply(self, name, value, positions):
+        if value is None or len(positions) == 0:
+            return positions
+        if name == "praefix":
+            return self._apply_bitmaps(positions, self._prefix_bits(*value))
+        if name in BITMAP_STAGES:
+            return self._apply_bitmaps(positions, self.bitmaps.value(BITMAP_STAGES[name], value))
+        if name == "groesse":
+            # (Breite, Hoehe, Zoll, Loadindex, Speedindex) - fehlende Angaben sind None
+            breite, hoehe, zoll, loadindex, speedindex = value
+            found = np.intersect1d(positions, self.size_index.lookup(breite, hoehe, zoll), assume_unique=True)
+            if loadindex or speedindex:
+                found = self._apply_bitmaps(found, self._index_bits(loadindex, speedindex))
+            return found
+        if name == "breite":
+            return np.intersect1d(positions, self.size_index.lookup(breite=value), assume_unique=True)
+        if name == "hoehe":
+            return np.intersect1d(positions, self.size_index.lookup(hoehe=value), assume_unique=True)
+        if name == "bestand":
+            return self._apply_bitmaps(positions, self.bitmaps.get("bestand_positiv")) if value else positions
+        if name == "preis":
+            preise = self._preis[positions]
+            return positions[(preise >= value[0]) & (preise <= value[1])]
+        if name == "sortierung":
+            columns, ascending = SORT_OPTIONS[value]
+            keys = self.df[columns].iloc[positions].reset_index(drop=True)
+            order = keys.sort_values(columns if len(columns) > 1 else columns[0], ascending=ascending).index
+            return positions[order.to_numpy()]
+        raise ValueError(f"Unbekannte Filterstufe: {name}")
+
+    def _get(self, key):
+        with self._lock:
+            positions = self._cache.get(key)
+            if positions is not None:
+                self._cache.move_to_end(key)
+            return positions
+
+    def _put(self, key, positions):
+        with self._lock:
+            self._cache[key] = positions
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+# ================================================================================================
+# FILTERPLAN - GEMEINSAMER PRÄFIX FÜR GRÖSSENLISTE UND ERGEBNISLISTE
+# ================================================================================================
+class FilterPlan:
+    """Filterplan einer Seitenanzeige.
+
+    Zoll, Bestand und Saison bilden den gemeinsamen Präfix: er wird einmal
+    per bitweisem UND ausgewertet und speist sowohl die Schnellauswahl der Reifengrößen als
+    auch die Ergebnisliste, die mit den restlichen Stufen darauf aufsetzt.
+    """
+
+    def __init__(self, engine, zoll=None, mit_bestand=False, saison=None):
+        self.engine = engine
+        self.prefix = [("praefix", (zoll, mit_bestand, saison))]
+        self.key = tuple(self.prefix)
+        self.positions = engine.run(self.prefix)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def sizes(self, max_sizes=12):
+        """Reifengrößen im Präfix als (Breite, Hoehe, Zoll), sortiert nach Zoll, Breite, Hoehe"""
+        return self.engine.cached(
+            self.key + (("groessen", max_sizes),),
+            lambda: self.engine.distinct_sizes(self.positions)[:max_sizes],
+        )
+
+    def results(self, stages):
+        """Positionen nach den restlichen Stufen - der Präfix kommt aus dem Cache"""
+        return self.engine.run(self.prefix + list(stages))
+
+    def facet_counts(self, stages, facet):
+        """Trefferzahlen je Wert einer Facette unter allen übrigen Filtern.
+
+        Die Stufe der Facette selbst bleibt außen vor, damit alle Alternativen
+        zur aktuellen Auswahl mit ihrer Trefferzahl sichtbar bleiben.
+        """
+        other = [(name, None if name == facet else value) for name, value in stages]
+        key = self.key + tuple(other) + (("facette", facet),)
+        return self.engine.cached(
+            key,
+            lambda: self.engine.count_values(FACET_STAGES[facet], self.results(other)),
+        )